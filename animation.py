@@ -0,0 +1,115 @@
+import math
+
+import numpy as np
+
+CHANNELS = {"x": 0, "y": 1, "rotation": 2}
+
+# Kinds of motion terms
+SINE, COSINE, LINEAR, WRAP = range(4)
+
+
+def oscillate(channel, amplitude, frequency, phase=0.0, wave="sin"):
+    """Swing a channel: ``amplitude * sin(frequency * t + phase)``.
+
+    ``wave="cos"`` uses a cosine instead.
+    """
+    return [(channel, SINE if wave == "sin" else COSINE, amplitude, frequency, phase)]
+
+
+def orbit(radius, frequency, phase=0.0):
+    """Circle around the base position, starting to the right of it."""
+    return oscillate("x", radius, frequency, phase, "cos") + oscillate("y", radius, frequency, phase)
+
+
+def linear_wrap(channel, speed, span, start=0.0):
+    """Move a channel at ``speed`` per frame from ``start``, wrapping around after ``span``."""
+    return [(channel, WRAP, span, speed, start)]
+
+
+def spin(rate):
+    """Rotate at ``rate`` degrees per frame."""
+    return [("rotation", LINEAR, 0.0, rate, 0.0)]
+
+
+class Animation:
+    """Positions and rotations of many animated items, for any time ``t``.
+
+    Every item has a base x, y and rotation plus any number of motion terms
+    from oscillate(), orbit(), linear_wrap() and spin(); terms on the same
+    channel add up, so paths are composed by listing several. All terms of
+    all items are evaluated together with a few NumPy expressions and
+    summed per item and channel with a single bincount.
+
+    With ``lut_size`` set, sines and cosines come from a precomputed table
+    of that many steps per period instead of being calculated; the error is
+    at most ``pi / lut_size`` times the amplitude.
+
+    Args:
+        lut_size: entries of the sine lookup table (a power of two), or
+            None to use np.sin and np.cos
+    """
+
+    def __init__(self, lut_size=None):
+        if lut_size is not None and lut_size & (lut_size - 1):
+            raise ValueError(f"lut_size must be a power of two, not {lut_size}")
+        self.lut_size = lut_size
+        self.lut = np.sin(np.arange(lut_size) * (2 * math.pi / lut_size)) if lut_size else None
+        self.base = []
+        self.terms = []
+        self._arrays = None
+
+    def __len__(self):
+        return len(self.base)
+
+    def add(self, *motions, x=0.0, y=0.0, rotation=0.0):
+        """Add an item with its motions and base position; returns its index."""
+        index = len(self.base)
+        self.base.append((x, y, rotation))
+        for motion in motions:
+            for channel, kind, amplitude, frequency, phase in motion:
+                self.terms.append((index * 3 + CHANNELS[channel], kind, amplitude, frequency, phase))
+        self._arrays = None
+        return index
+
+    def _build(self):
+        base = np.array(self.base, dtype=np.float64).reshape(-1, 3)
+        terms = np.array(self.terms, dtype=np.float64).reshape(-1, 5)
+        kind = terms[:, 1]
+        # Each kind of term as its own contiguous group of arrays
+        groups = {}
+        for code in (SINE, COSINE, LINEAR, WRAP):
+            rows = terms[kind == code]
+            groups[code] = (rows[:, 0].astype(np.int64), rows[:, 2], rows[:, 3], rows[:, 4])
+        self._arrays = base, groups
+
+    def _wave(self, arg, cosine):
+        if self.lut is None:
+            return np.cos(arg) if cosine else np.sin(arg)
+        steps = arg * (self.lut_size / (2 * math.pi)) + 0.5
+        if cosine:
+            steps += self.lut_size // 4  # cos(a) = sin(a + pi/2)
+        return self.lut[np.floor(steps).astype(np.int64) & (self.lut_size - 1)]
+
+    def evaluate(self, t):
+        """Return arrays ``(x, y, rotation)`` of every item at time ``t``."""
+        if self._arrays is None:
+            self._build()
+        base, groups = self._arrays
+
+        targets, values = [], []
+        for code, (target, amplitude, frequency, phase) in groups.items():
+            if not len(target):
+                continue
+            if code == SINE or code == COSINE:
+                values.append(self._wave(t * frequency + phase, code == COSINE) * amplitude)
+            elif code == LINEAR:
+                values.append(t * frequency)
+            else:
+                values.append((t * frequency + phase) % amplitude)
+            targets.append(target)
+
+        channels = base.copy()
+        if targets:
+            channels += np.bincount(np.concatenate(targets), np.concatenate(values),
+                                    minlength=base.size).reshape(-1, 3)
+        return channels[:, 0], channels[:, 1], channels[:, 2]
@@ -0,0 +1,205 @@
+"""Frame-time benchmarks for all demos.
+
+Every scenario runs headless in its own process (see headless.py), so peak
+RSS is measured per scenario. Results go to a JSON file:
+
+    python benchmark.py --output bench.json
+    python benchmark.py --output new.json --compare bench.json
+    python benchmark.py --replay session.rec
+
+A recorded session (see replay.py) runs as scenario ``replay:<path>``, with
+the seed, input and simulation ticks it was recorded with.
+"""
+import argparse
+import importlib
+import inspect
+import json
+import math
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pygame
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+import replay
+from headless import run
+from profiler import FrameProfiler
+from runtime import ScriptedInput, key_down, mouse_down
+
+
+def _twenty_emitters():
+    # Click 20 emitters across the screen, cycling fountain, explosion,
+    # smoke and rain (skipping cloud, which is not an emitter)
+    events = {}
+    current = 0
+    for i in range(20):
+        events.setdefault(i * 3, []).append(mouse_down())
+        wanted = (i + 1) % 4
+        events.setdefault(i * 3 + 1, []).extend(key_down(pygame.K_SPACE) for _ in range((wanted - current) % 5))
+        current = wanted
+    return ScriptedInput(events, lambda frame: (40 + (frame // 3) * 38, 200 + (frame // 3) % 4 * 80))
+
+
+def _cloud_burst():
+    # Switch to cloud mode and drop ten clouds that rain onto the ground
+    events = {0: [key_down(pygame.K_SPACE) for _ in range(4)]}
+    for i in range(10):
+        events.setdefault(1 + i * 5, []).append(mouse_down())
+    return ScriptedInput(events, lambda frame: (80 + (frame // 5) * 70, 120))
+
+
+def _emitter_flood():
+    # Keep clicking: an emitter every other frame and a type change every
+    # 20 frames, clouds included, so emitters stack far past the budget
+    events = {}
+    for frame in range(0, 900, 2):
+        events.setdefault(frame, []).append(mouse_down())
+    for frame in range(1, 900, 20):
+        events.setdefault(frame, []).append(key_down(pygame.K_SPACE))
+    return ScriptedInput(events, lambda frame: (60 + (frame * 37) % 680, 80 + (frame * 11) % 380))
+
+
+def _rain_storm():
+    # Grow the cloud to full size and keep it raining while sweeping
+    events = {0: [key_down(pygame.K_PLUS) for _ in range(20)] + [mouse_down()]}
+    return ScriptedInput(events, lambda frame: (400 + 350 * math.sin(frame * 0.01), 120))
+
+
+def _fire_round():
+    # Leave the fires of a late round alone so they grow and spread
+    return ScriptedInput(mouse=lambda frame: (400, 100))
+
+
+SCENARIOS = {
+    'static_rectangles': ("rectangle_example", 600, ScriptedInput, {}),
+    'moving_rectangles': ("moving_rectangle_example", 600, ScriptedInput, {}),
+    'animated_crowd_10k': ("moving_rectangle_example", 120, ScriptedInput, {'extra_rects': 10000}),
+    'bouncing_particles': ("particle_system_example", 600, ScriptedInput, {}),
+    'three_emitters': ("emitter_particle_system", 600, ScriptedInput, {}),
+    'twenty_emitters': ("mouse_emitter_system", 600, _twenty_emitters, {}),
+    'cloud_burst': ("mouse_emitter_system", 600, _cloud_burst, {}),
+    'emitter_flood': ("mouse_emitter_system", 900, _emitter_flood, {}),
+    'rain_storm': ("cursor_cloud_system", 600, _rain_storm, {}),
+    'fire_round_10': ("cursor_cloud_system", 900, _fire_round, {'start_round': 10}),
+}
+
+REPLAY_PREFIX = "replay:"
+
+
+def run_scenario(name, seed=0):
+    """Run one scenario in this process and return its measurements."""
+    if name.startswith(REPLAY_PREFIX):
+        recording = replay.load(name[len(REPLAY_PREFIX):])
+        demo, frames, make_input, options = recording.demo, recording.frames, recording.input, recording.main_options()
+        seed = recording.seed
+    else:
+        demo, frames, make_input, options = SCENARIOS[name]
+    frame_times = []
+    particle_counts = []
+    last = [time.perf_counter()]
+
+    def on_frame(screen, particle_count):
+        now = time.perf_counter()
+        frame_times.append(now - last[0])
+        last[0] = now
+        particle_counts.append(particle_count)
+
+    # Demos with phase instrumentation also report where the time went
+    profiler = None
+    if "profiler" in inspect.signature(importlib.import_module(demo).main).parameters:
+        profiler = FrameProfiler(window=frames)
+        options = dict(options, profiler=profiler)
+
+    result = run(demo, frames, seed, make_input(), on_frame, digest=False, **options)
+
+    times_ms = np.array(frame_times) * 1000
+    total_seconds = float(np.sum(frame_times))
+    return {
+        'scenario': name,
+        'demo': demo,
+        'frames': frames,
+        'seed': seed,
+        'seconds': result['seconds'],
+        'frame_ms': {
+            'mean': float(times_ms.mean()),
+            'p50': float(np.percentile(times_ms, 50)),
+            'p95': float(np.percentile(times_ms, 95)),
+            'p99': float(np.percentile(times_ms, 99)),
+            'max': float(times_ms.max()),
+        },
+        'particles_mean': float(np.mean(particle_counts)),
+        'particles_peak': int(np.max(particle_counts)),
+        'particles_per_second': float(np.sum(particle_counts) / total_seconds),
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None,
+        'phase_ms': {name: stats['mean'] for name, stats in profiler.stats().items()} if profiler else None,
+    }
+
+
+def run_isolated(name, seed=0):
+    """Run one scenario in a fresh Python process."""
+    output = subprocess.run([sys.executable, __file__, "--worker", name, "--seed", str(seed)],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def compare(results, baseline):
+    old = {r['scenario']: r for r in baseline['scenarios']}
+    for result in results:
+        before = old.get(result['scenario'])
+        if not before:
+            continue
+        ratio = result['frame_ms']['p50'] / before['frame_ms']['p50']
+        print(f"  {result['scenario']:<20} p50 {before['frame_ms']['p50']:7.2f} -> "
+              f"{result['frame_ms']['p50']:7.2f} ms ({ratio:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("scenarios", nargs="*", help=f"scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--compare", help="earlier benchmark JSON to compare against")
+    parser.add_argument("--replay", action="append", default=[], metavar="PATH",
+                        help="also run a recorded session; only recordings when no scenarios are named")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_scenario(args.worker, args.seed)))
+        return
+
+    results = []
+    names = args.scenarios or ([] if args.replay else list(SCENARIOS))
+    for name in names + [REPLAY_PREFIX + path for path in args.replay]:
+        result = run_isolated(name, args.seed)
+        frame_ms = result['frame_ms']
+        print(f"{name:<20} p50 {frame_ms['p50']:6.2f}  p95 {frame_ms['p95']:6.2f}  p99 {frame_ms['p99']:6.2f} ms  "
+              f"{result['particles_per_second']:10.0f} particles/s  {result['peak_rss_kb']} KB")
+        results.append(result)
+
+    report = {
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'scenarios': results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print(f"Compared to {args.compare}:")
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import numpy as np
+
+
+class ParticleBudget:
+    """Shares a maximum number of live particles between everything that spawns them.
+
+    Below ``soft_limit`` of the maximum every spawn goes ahead. Above it
+    the budget degrades step by step as the pool fills up: new particles
+    get shorter lives, so the population drains faster, and spawns are
+    turned away from the lowest priority up, so the least important
+    effects thin out first. At the maximum nothing spawns at all.
+
+    Decisions depend only on the live count, never on chance, so seeded
+    runs stay reproducible. Spawns granted but not yet added to the pool
+    count as live until commit(), so several grants made before one
+    batched add cannot overshoot the maximum together.
+
+    Args:
+        particles: the particle pool to watch, anything with len()
+        max_particles: number of live particles allowed
+        priorities: priority per kind of spawn, higher is more important;
+            kinds not listed get priority 0
+        soft_limit: fraction of max_particles where throttling starts
+        min_ttl_scale: factor lifetimes are shortened by at the maximum
+    """
+
+    def __init__(self, particles, max_particles=2000, priorities=None, soft_limit=0.75, min_ttl_scale=0.25):
+        self.particles = particles
+        self.max_particles = max_particles
+        self.priorities = dict(priorities or {})
+        self.top_priority = max(self.priorities.values(), default=0)
+        self.soft_limit = soft_limit
+        self.min_ttl_scale = min_ttl_scale
+        self.dropped = {}
+        self.shortened = 0
+        self.pending = 0  # Granted spawns not yet in the pool
+
+    def live(self):
+        """Particles in the pool plus the granted spawns still to be added."""
+        return len(self.particles) + self.pending
+
+    def pressure(self):
+        """How far the pool is between the soft limit (0.0) and the maximum (1.0)."""
+        soft = self.soft_limit * self.max_particles
+        live = self.live()
+        if live <= soft:
+            return 0.0
+        return min(1.0, (live - soft) / (self.max_particles - soft))
+
+    def allow(self, kind):
+        """Whether a particle of ``kind`` may spawn now; refusals are counted."""
+        return self.grant(kind, 1) == 1
+
+    def grant(self, kind, count):
+        """How many of ``count`` spawns of ``kind`` may go ahead now; refusals are counted.
+
+        The granted spawns are held as pending until commit().
+        """
+        granted = 0
+        # Each priority level keeps spawning up to its own share of the
+        # range between the soft limit and the maximum
+        if self.pressure() < (self.priorities.get(kind, 0) + 1) / (self.top_priority + 1):
+            granted = max(0, min(count, self.max_particles - self.live()))
+        if granted < count:
+            self.dropped[kind] = self.dropped.get(kind, 0) + count - granted
+        self.pending += granted
+        return granted
+
+    def commit(self):
+        """Mark the spawns granted so far as added to the pool (or given up)."""
+        self.pending = 0
+
+    def ttl(self, ttl):
+        """Lifetime for new particles, shortened while the pool is under pressure.
+
+        Takes a single lifetime or an array of them.
+        """
+        pressure = self.pressure()
+        if pressure == 0.0:
+            return ttl
+        scale = 1 - (1 - self.min_ttl_scale) * pressure
+        if np.ndim(ttl):
+            self.shortened += len(ttl)
+            return np.maximum(1, (np.asarray(ttl) * scale).astype(np.int64))
+        self.shortened += 1
+        return max(1, int(ttl * scale))
+
+    def stats(self):
+        return {
+            'live': self.live(),
+            'max': self.max_particles,
+            'pressure': self.pressure(),
+            'dropped': dict(self.dropped),
+            'shortened': self.shortened,
+        }
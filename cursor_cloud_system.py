@@ -1,8 +1,22 @@
 import pygame
 import math
 import random
-
-def rechthoek(surface, x=100, y=100, width=80, height=40, color=(255, 255, 255), rotation=0, alpha=255):
+import sys
+
+import numpy as np
+
+from ground import Ground
+from hud import Hud
+from lod import LevelOfDetail
+from particle_buffer import OwnerRegistry, ParticleBuffer
+from profiler import FrameProfiler
+from sprite_cache import SpriteCache
+from runtime import FixedStepScheduler, LiveInput
+from spawn_ranges import SpawnRanges
+from spatial_index import SortedXList
+from surface_pool import scratch_pool
+
+def rechthoek(surface, x=100, y=100, width=80, height=40, color=(255, 255, 255), rotation=0, alpha=255, cache=None):
     """Draw a rectangle with position, color, rotation, and transparency.
 
     Args:
@@ -12,8 +26,16 @@ def rechthoek(surface, x=100, y=100, width=80, height=40, color=(255, 255, 255),
         color: RGB color tuple
         rotation: rotation angle in degrees
         alpha: transparency (0-255)
+        cache: optional SpriteCache; rotation and alpha are snapped to its
+            steps and the rectangle is blitted from a cached sprite
     """
-    temp_surface = pygame.Surface((width + 10, height + 10), pygame.SRCALPHA)
+    if cache is not None:
+        step, level = cache.quantize(rotation, alpha)
+        sprite = cache.get(width, height, tuple(color), int(step), int(level))
+        surface.blit(sprite, (x - (width + 10) // 2, y - (height + 10) // 2))
+        return
+
+    temp_surface = scratch_pool.acquire(width + 10, height + 10)
 
     if rotation == 0:
         rect = pygame.Rect(5, 5, width, height)
@@ -33,72 +55,25 @@ def rechthoek(surface, x=100, y=100, width=80, height=40, color=(255, 255, 255),
 
         pygame.draw.polygon(temp_surface, (*color, alpha), points)
 
-    surface.blit(temp_surface, (x - (width + 10) // 2, y - (height + 10) // 2))
-
-class Particle:
-    def __init__(self, x, y, vx, vy, width, height, color, ttl, gravity=0, particle_type="normal"):
-        self.x = x
-        self.y = y
-        self.vx = vx
-        self.vy = vy
-        self.width = width
-        self.height = height
-        self.rotation = random.uniform(0, 360)
-        self.rotation_speed = random.uniform(-3, 3)
-        self.color = color
-        self.ttl = ttl
-        self.max_ttl = ttl
-        self.gravity = gravity
-        self.particle_type = particle_type
-
-    def update(self, ground_y=None, ground_rects=None):
-        self.x += self.vx
-        self.y += self.vy
-        self.vy += self.gravity
-        self.rotation += self.rotation_speed
-        self.ttl -= 1
-
-        # Check for ground collision for rain particles
-        if ground_y and self.gravity > 0 and self.y >= ground_y:
-            self.y = ground_y
-            self.vy = -abs(self.vy) * 0.3  # Bounce up with reduced velocity
-            self.vx *= 0.8  # Reduce horizontal velocity
-            self.ttl = min(self.ttl, 30)  # Force death soon after bouncing
-
-            # Make ground blocks wetter when rain hits
-            if ground_rects:
-                for rect in ground_rects:
-                    rect_left = rect['x'] - rect['width'] // 2
-                    rect_right = rect['x'] + rect['width'] // 2
-                    if rect_left <= self.x <= rect_right:
-                        rect['wetness'] = min(rect['wetness'] + 10, 100)
-                        break
-
-    def get_alpha(self):
-        return max(0, int(255 * (self.ttl / self.max_ttl)))
-
-    def is_dead(self):
-        return self.ttl <= 0
-
-    def draw(self, surface):
-        alpha = self.get_alpha()
-        rechthoek(surface, self.x, self.y, self.width, self.height, self.color, self.rotation, alpha)
+    surface.blit(temp_surface, (x - (width + 10) // 2, y - (height + 10) // 2), (0, 0, width + 10, height + 10))
+    scratch_pool.release_all()
 
 class CloudParticle:
-    def __init__(self, offset_x, offset_y, cloud_particles_count=20):
+    def __init__(self, offset_x, offset_y, cloud_particles_count=20, rng=random):
+        self.rng = rng
         self.offset_x = offset_x
         self.offset_y = offset_y
-        self.local_vx = random.uniform(-0.05, 0.05)
-        self.local_vy = random.uniform(-0.05, 0.05)
+        self.local_vx = self.rng.uniform(-0.05, 0.05)
+        self.local_vy = self.rng.uniform(-0.05, 0.05)
 
         # Scale cloud particle size based on total cloud size
         base_size = 12 + (cloud_particles_count - 5) * 0.8  # Grows with cloud size
-        size_variation = random.randint(-3, 8)
+        size_variation = self.rng.randint(-3, 8)
         self.width = max(8, int(base_size + size_variation))
         self.height = max(8, int(base_size + size_variation))
 
-        self.rotation = random.uniform(0, 360)
-        self.rotation_speed = random.uniform(-0.5, 0.5)
+        self.rotation = self.rng.uniform(0, 360)
+        self.rotation_speed = self.rng.uniform(-0.5, 0.5)
         self.color = (220, 220, 230)
 
     def update(self, mouse_x, mouse_y, cloud_size):
@@ -115,96 +90,168 @@ class CloudParticle:
         self.offset_x = max(-max_x, min(max_x, self.offset_x))
         self.offset_y = max(-max_y, min(max_y, self.offset_y))
 
+        self.follow(mouse_x, mouse_y)
+
+    def follow(self, mouse_x, mouse_y):
         # Actual position follows mouse with offset - no screen bounds
         self.x = mouse_x + self.offset_x
         self.y = mouse_y + self.offset_y
 
-    def create_rain_or_fog(self):
-        # Create a rain or fog particle below this cloud particle
-        particle_x = self.x + random.uniform(-self.width//2, self.width//2)
-        particle_y = self.y + self.height//2
-
-        # Check if cloud is in bottom half of screen (300px is middle of 600px screen)
-        if self.y > 300:
-            # Create fog particle in bottom half
-            return Particle(
-                particle_x, particle_y,
-                random.uniform(-0.3, 0.3), random.uniform(-0.2, 0.5),
-                random.randint(8, 20), random.randint(8, 20),
-                (200, 200, 210), random.randint(180, 300),
-                0, "fog"
-            )
-        else:
-            # Create rain particle in top half
-            distance_to_ground = max(100, 550 - particle_y)
-            ttl = int(distance_to_ground / 2) + random.randint(50, 100)
-
-            return Particle(
-                particle_x, particle_y,
-                random.uniform(-0.5, 0.5), random.uniform(0.5, 3),
-                random.randint(3, 6), random.randint(8, 12),
-                (100, 150, 255), ttl,
-                random.uniform(0.05, 0.15), "rain"
-            )
-
-    def draw(self, surface):
-        rechthoek(surface, self.x, self.y, self.width, self.height, self.color, self.rotation)
-
-def main():
+    def draw(self, surface, cache=None):
+        rechthoek(surface, self.x, self.y, self.width, self.height, self.color, self.rotation, cache=cache)
+
+# Value ranges of fog and rain below cloud particles, and of fire particles
+FOG = SpawnRanges(offset=(-1.0, 1.0), vx=(-0.3, 0.3), vy=(-0.2, 0.5), width=(8, 20), height=(8, 20),
+                  ttl=(180, 300), gravity=(0.0, 0.0))
+RAIN = SpawnRanges(offset=(-1.0, 1.0), vx=(-0.5, 0.5), vy=(0.5, 3.0), width=(3, 6), height=(8, 12),
+                   ttl=(50, 100), gravity=(0.05, 0.15))
+FIRE = SpawnRanges(offset=(-5.0, 5.0), vx=(-0.5, 0.5), vy=(-3.0, -1.0), width=(4, 10), height=(6, 15),
+                   color=((255, 100, 0), (255, 200, 50)), ttl=(60, 120))
+
+def create_rain_or_fog(clouds, particles, np_rng):
+    """Create a rain or fog particle below each of the given cloud particles.
+
+    Clouds in the bottom half of the screen (300px is middle of 600px
+    screen) make fog, the others rain. Each kind is drawn from ``np_rng``
+    in one go and added with one add_many() call.
+    """
+    fog = [cloud for cloud in clouds if cloud.y > 300]
+    rain = [cloud for cloud in clouds if cloud.y <= 300]
+    for group, ranges, color, particle_type in ((fog, FOG, (200, 200, 210), "fog"), (rain, RAIN, (100, 150, 255), "rain")):
+        if not group:
+            continue
+        spawn = ranges.draw(np_rng, len(group))
+        x = np.array([cloud.x for cloud in group]) + spawn['offset'] * [cloud.width // 2 for cloud in group]
+        y = np.array([cloud.y + cloud.height // 2 for cloud in group])
+        ttl = spawn['ttl']
+        if particle_type == "rain":
+            # Rain lives long enough to reach the ground
+            ttl = ttl + (np.maximum(100, 550 - y) / 2).astype(np.int64)
+        particles.add_many(x, y, spawn['vx'], spawn['vy'], spawn['width'], spawn['height'],
+                           color, ttl, spawn['gravity'], particle_type)
+
+class FireEmitter:
+    """A fire on the ground that emits fire particles, grows and spreads."""
+
+    __slots__ = ('x', 'y', 'max_particles', 'emit_rate', 'active_particles', 'emit_timer', 'active',
+                 'age', 'growth_timer', 'spawn_timer', 'handle')
+
+    def __init__(self, x, y, max_particles, emit_rate):
+        self.x = x
+        self.y = y
+        self.max_particles = max_particles
+        self.emit_rate = emit_rate
+        self.active_particles = 0
+        self.emit_timer = 0
+        self.active = True
+        self.age = 0  # How long the fire has existed
+        self.growth_timer = 0  # Timer for growing the fire
+        self.spawn_timer = 0  # Timer for spawning new fires
+        self.handle = -1  # Owner handle of this fire's particles
+
+class Fires:
+    """All fire emitters of a round, with the burning ones indexed by x.
+
+    The index is kept up to date as fires are lit and put out, so spacing
+    checks for new fires and the extinguish test need no scan over every
+    fire. Iterating gives all fires, burning or not, in the order they
+    were lit, including fires lit during the iteration.
+    """
+
+    def __init__(self):
+        self.emitters = []
+        self.burning = SortedXList()
+        self.owners = OwnerRegistry()
+
+    def __len__(self):
+        return len(self.emitters)
+
+    def __iter__(self):
+        return iter(self.emitters)
+
+    def light(self, x, y, max_particles, emit_rate):
+        fire = FireEmitter(x, y, max_particles, emit_rate)
+        fire.handle = self.owners.register(fire)
+        self.emitters.append(fire)
+        self.burning.add(x, fire)
+        return fire
+
+    def extinguish(self, fire):
+        if fire.active:
+            fire.active = False
+            self.burning.remove(fire.x, fire)
+
+    def burning_near(self, x, distance):
+        """Whether a burning fire is less than ``distance`` away from ``x``."""
+        return self.burning.any_within(x, distance)
+
+    def clear(self):
+        self.emitters.clear()
+        self.burning.clear()
+        self.owners.clear()
+
+def emit_fire(fires, particles, np_rng):
+    """Emit one fire particle from each of the given fires, all drawn in one batch."""
+    spawn = FIRE.draw(np_rng, len(fires))
+    added = particles.add_many(
+        np.array([fire.x for fire in fires]) + spawn['offset'], [fire.y for fire in fires],
+        spawn['vx'], spawn['vy'], spawn['width'], spawn['height'], spawn['color'], spawn['ttl'],
+        0, "fire", [fire.handle for fire in fires]
+    )
+    for fire in fires[:len(added)]:
+        fire.active_particles += 1
+
+def main(frames=None, rng=random, input_source=None, fps=60, on_frame=None, sprite_cache=None, start_round=1, profiler=None, scheduler=None, lod=None):
     pygame.init()
     screen = pygame.display.set_mode((800, 600))
     pygame.display.set_caption("Cursor Cloud System")
     clock = pygame.time.Clock()
+    input_source = input_source or LiveInput()
+    scheduler = scheduler or FixedStepScheduler(60, lockstep=not fps)
+    profiler = profiler or FrameProfiler()
+    hud = Hud()
+    # Hold the frame rate by simplifying particles; headless runs keep full detail
+    lod = lod or LevelOfDetail(target_ms=1000 / fps if fps else None)
 
     # Create cloud particles that follow the mouse
     initial_count = 20
     cloud_particles = []
     for _ in range(initial_count):
-        offset_x = random.uniform(-50, 50)
-        offset_y = random.uniform(-30, 30)
-        cloud_particles.append(CloudParticle(offset_x, offset_y, initial_count))
+        offset_x = rng.uniform(-50, 50)
+        offset_y = rng.uniform(-30, 30)
+        cloud_particles.append(CloudParticle(offset_x, offset_y, initial_count, rng))
 
-    rain_particles = []
+    rain_particles = ParticleBuffer(rng=rng)
+    # Random parameters of new particles come in batches from a NumPy generator
+    np_rng = rain_particles.np_rng
     ground_y = 550
 
     # Generate fixed ground rectangles with random widths and heights
-    ground_rects = []
-    x = 0
-    while x < 800:
-        width = random.randint(4, 16)
-        height = random.randint(3, 12)
-        ground_rects.append({'x': x + width // 2, 'width': width, 'height': height, 'wetness': 0})
-        x += width
-
-    # Create random fire emitters on the ground
-    fire_emitters = []
-    for _ in range(random.randint(3, 6)):  # 3-6 fires
-        fire_x = random.randint(50, 750)  # Keep away from edges
-        fire_emitter = {
-            'x': fire_x,
-            'y': ground_y - 10,  # Slightly above ground
-            'max_particles': random.randint(15, 25),
-            'emit_rate': random.randint(2, 4),
-            'active_particles': 0,
-            'emit_timer': 0,
-            'active': True,
-            'age': 0,  # How long the fire has existed
-            'growth_timer': 0,  # Timer for growing the fire
-            'spawn_timer': 0  # Timer for spawning new fires
-        }
-        fire_emitters.append(fire_emitter)
+    ground = Ground(ground_y, 800, rng)
+
+    # Create random fire emitters on the ground: 3-6 in the first round,
+    # more when starting at a later round. Fire particles carry a handle
+    # to the fire that emitted them.
+    fire_emitters = Fires()
+    initial_fires = rng.randint(3, 6) if start_round == 1 else min(10, 3 + start_round)
+    for _ in range(initial_fires):
+        fire_x = rng.randint(50, 750)  # Keep away from edges
+        # Slightly above ground
+        fire_emitters.light(fire_x, ground_y - 10, rng.randint(15, 25), rng.randint(2, 4))
 
     # Global fire spawn cooldown
     fire_spawn_cooldown = 0
-    round_number = 1
+    round_number = start_round
     round_cooldown = 0  # Cooldown between rounds
 
     mouse_pressed = False
     rain_timer = 0
 
+    frame = 0
     running = True
     while running:
-        for event in pygame.event.get():
+        for event in input_source.events():
+            profiler.handle_event(event)
             if event.type == pygame.QUIT:
                 running = False
             elif event.type == pygame.MOUSEBUTTONDOWN:
@@ -218,14 +265,14 @@ def main():
                     # Grow cloud - add more particles and resize existing ones
                     if len(cloud_particles) < 40:
                         current_count = len(cloud_particles)
-                        offset_x = random.uniform(-50, 50)
-                        offset_y = random.uniform(-30, 30)
-                        cloud_particles.append(CloudParticle(offset_x, offset_y, current_count + 1))
+                        offset_x = rng.uniform(-50, 50)
+                        offset_y = rng.uniform(-30, 30)
+                        cloud_particles.append(CloudParticle(offset_x, offset_y, current_count + 1, rng))
 
                         # Resize existing particles to match new cloud size
                         for particle in cloud_particles[:-1]:  # All except the new one
                             base_size = 12 + (current_count + 1 - 5) * 0.8
-                            size_variation = random.randint(-3, 8)
+                            size_variation = rng.randint(-3, 8)
                             particle.width = max(8, int(base_size + size_variation))
                             particle.height = max(8, int(base_size + size_variation))
 
@@ -238,231 +285,212 @@ def main():
                         # Resize remaining particles to match new smaller cloud size
                         for particle in cloud_particles:
                             base_size = 12 + (current_count - 5) * 0.8
-                            size_variation = random.randint(-3, 8)
+                            size_variation = rng.randint(-3, 8)
                             particle.width = max(8, int(base_size + size_variation))
                             particle.height = max(8, int(base_size + size_variation))
 
-        screen.fill((40, 60, 80))  # Darker sky color
-
-        mouse_x, mouse_y = pygame.mouse.get_pos()
+        mouse_x, mouse_y = input_source.mouse_pos()
 
         # Calculate cloud size based on number of cloud particles visible
         cloud_size = len(cloud_particles)
-
-        # Update cloud particles to follow mouse
-        for cloud in cloud_particles:
-            cloud.update(mouse_x, mouse_y, cloud_size)
         # Rain intensity based on cloud size (more particles = more rain)
         rain_chance = min(0.8, cloud_size * 0.03)  # Cap at 80% chance
 
-        # Create rain when mouse is pressed
-        if mouse_pressed:
-            rain_timer += 1
-            rain_frequency = max(1, 5 - cloud_size // 4)  # Bigger clouds rain more frequently
-            if rain_timer >= rain_frequency:
+        # Simulate in fixed ticks, however fast frames are drawn
+        for _ in range(scheduler.advance()):
+            with profiler.phase("rain"):
+                # Update cloud particles to follow mouse
                 for cloud in cloud_particles:
-                    if random.random() < rain_chance:
-                        rain_particles.append(cloud.create_rain_or_fog())
-                rain_timer = 0
-
-        # Update fire spawn cooldown and round cooldown
-        fire_spawn_cooldown = max(0, fire_spawn_cooldown - 1)
-        round_cooldown = max(0, round_cooldown - 1)
-
-        # Update fire emitters
-        for fire in fire_emitters:
-            if not fire['active']:
-                continue
-
-            # Age the fire
-            fire['age'] += 1
-            fire['growth_timer'] += 1
-            fire['spawn_timer'] += 1
-
-            # Grow fire every 300 frames (5 seconds at 60fps)
-            if fire['growth_timer'] >= 300:
-                fire['max_particles'] = min(50, fire['max_particles'] + 5)  # Cap at 50
-                fire['emit_rate'] = max(1, fire['emit_rate'] - 1)  # Faster emission, min 1
-                fire['growth_timer'] = 0
-
-            # Spawn new fire every 300 frames if no global cooldown
-            if fire['spawn_timer'] >= 300 and fire_spawn_cooldown <= 0:
-                # Try to spawn a new fire nearby
-                attempts = 0
-                while attempts < 10:  # Try 10 times to find a good spot
-                    new_x = fire['x'] + random.randint(-100, 100)
-                    if 50 <= new_x <= 750:  # Keep within bounds
-                        # Check if too close to existing fires
-                        too_close = False
-                        for existing_fire in fire_emitters:
-                            if existing_fire['active'] and abs(existing_fire['x'] - new_x) < 80:
-                                too_close = True
-                                break
-
-                        if not too_close:
-                            new_fire = {
-                                'x': new_x,
-                                'y': ground_y - 10,
-                                'max_particles': random.randint(10, 15),  # Start smaller
-                                'emit_rate': random.randint(3, 5),
-                                'active_particles': 0,
-                                'emit_timer': 0,
-                                'active': True,
-                                'age': 0,
-                                'growth_timer': 0,
-                                'spawn_timer': 0
-                            }
-                            fire_emitters.append(new_fire)
-                            fire_spawn_cooldown = 300  # 5 second global cooldown
-                            break
-                    attempts += 1
-                fire['spawn_timer'] = 0
-
-            # Emit fire particles
-            fire['emit_timer'] += 1
-            if fire['emit_timer'] >= fire['emit_rate'] and fire['active_particles'] < fire['max_particles']:
-                # Create fire particle
-                fire_particle = Particle(
-                    fire['x'] + random.uniform(-5, 5),
-                    fire['y'],
-                    random.uniform(-0.5, 0.5),
-                    random.uniform(-3, -1),
-                    random.randint(4, 10),
-                    random.randint(6, 15),
-                    (255, random.randint(100, 200), random.randint(0, 50)),
-                    random.randint(60, 120),
-                    0, "fire"
-                )
-                rain_particles.append(fire_particle)
-                fire['active_particles'] += 1
-                fire['emit_timer'] = 0
-
-        # Check for rain hitting fires (extinguishing them)
-        for particle in rain_particles:
-            if particle.particle_type == "rain":
-                for fire in fire_emitters:
-                    if fire['active'] and abs(particle.x - fire['x']) < 20 and abs(particle.y - fire['y']) < 30:
-                        fire['active'] = False  # Extinguish fire
-
-        # Draw underground base layer
-        rechthoek(screen, 400, 575, 800, 50, (60, 40, 20))
-
-        # Draw gravelly ground with small rectangles
-        for rect in ground_rects:
-            # Calculate color based on wetness - more blue when wet
-            base_gray = 80
-            blue_amount = int(rect['wetness'] * 1.5)
-            color = (max(0, base_gray - blue_amount // 2), max(0, base_gray - blue_amount // 2), min(255, base_gray + blue_amount))
-            rechthoek(screen, rect['x'], ground_y - rect['height'] // 2, rect['width'], rect['height'], color)
-
-            # Slowly dry the ground over time
-            rect['wetness'] = max(0, rect['wetness'] - 0.2)
-
-        # Update and draw rain particles
-        dead_particles = [p for p in rain_particles if p.is_dead()]
-
-        # Count fire particles per emitter and update counts
-        fire_particle_counts = {}
-        for fire in fire_emitters:
-            fire_particle_counts[id(fire)] = 0
-
-        for particle in rain_particles:
-            if particle.particle_type == "fire" and not particle.is_dead():
-                # Find closest fire emitter (rough matching)
-                closest_fire = None
-                min_distance = float('inf')
+                    cloud.update(mouse_x, mouse_y, cloud_size)
+
+                # Create rain when mouse is pressed
+                if mouse_pressed:
+                    rain_timer += 1
+                    rain_frequency = max(1, 5 - cloud_size // 4)  # Bigger clouds rain more frequently
+                    if rain_timer >= rain_frequency:
+                        raining = [cloud for cloud, roll in zip(cloud_particles, np_rng.random(cloud_size).tolist())
+                                   if roll < rain_chance]
+                        if raining:
+                            create_rain_or_fog(raining, rain_particles, np_rng)
+                        rain_timer = 0
+
+            with profiler.phase("fires"):
+                # Update fire spawn cooldown and round cooldown
+                fire_spawn_cooldown = max(0, fire_spawn_cooldown - 1)
+                round_cooldown = max(0, round_cooldown - 1)
+
+                # Update fire emitters
+                emitting = []
                 for fire in fire_emitters:
-                    if fire['active']:
-                        distance = abs(particle.x - fire['x'])
-                        if distance < min_distance and distance < 15:  # Within reasonable range
-                            min_distance = distance
-                            closest_fire = fire
-                if closest_fire:
-                    fire_particle_counts[id(closest_fire)] += 1
-
-        # Update fire particle counts
-        for fire in fire_emitters:
-            fire['active_particles'] = fire_particle_counts.get(id(fire), 0)
-
-        rain_particles = [p for p in rain_particles if not p.is_dead()]
-        for particle in rain_particles:
-            particle.update(ground_y, ground_rects)
-            particle.draw(screen)
-
-        # Draw cloud particles
-        for cloud in cloud_particles:
-            cloud.draw(screen)
-
-        # Draw UI
-        font = pygame.font.Font(None, 24)
-        text = font.render(f"Particles: {len(rain_particles)}", True, (255, 255, 255))
-        screen.blit(text, (10, 10))
-
-        text = font.render(f"Cloud size: {cloud_size} | Rain intensity: {int(rain_chance * 100)}%", True, (255, 255, 255))
-        screen.blit(text, (10, 35))
-
-        mouse_x, mouse_y = pygame.mouse.get_pos()
-        if mouse_y > 300:
-            text = font.render("Hold mouse button to create fog!", True, (255, 255, 255))
-        else:
-            text = font.render("Hold mouse button to make it rain!", True, (255, 255, 255))
-        screen.blit(text, (10, 60))
-
-        text = font.render("Press +/- to grow/shrink cloud", True, (255, 255, 255))
-        screen.blit(text, (10, 85))
-
-        active_fires = sum(1 for fire in fire_emitters if fire['active'])
-
-        # Check if all fires are extinguished - start new round
-        if active_fires == 0 and len(fire_emitters) > 0 and round_cooldown == 0:
-            # Start round cooldown
-            round_cooldown = 180  # 3 seconds at 60fps
-
-        # Create new round after cooldown
-        if active_fires == 0 and len(fire_emitters) > 0 and round_cooldown == 1:
-            # Clear all old fire emitters
-            fire_emitters.clear()
-            round_number += 1
-
-            # Create new round of fires (more fires each round)
-            num_fires = min(10, 3 + round_number)
-            for _ in range(num_fires):
-                fire_x = random.randint(50, 750)
-                fire_emitter = {
-                    'x': fire_x,
-                    'y': ground_y - 10,
-                    'max_particles': random.randint(15, 25),
-                    'emit_rate': random.randint(2, 4),
-                    'active_particles': 0,
-                    'emit_timer': 0,
-                    'active': True,
-                    'age': 0,
-                    'growth_timer': 0,
-                    'spawn_timer': 0
-                }
-                fire_emitters.append(fire_emitter)
-
-            fire_spawn_cooldown = 0  # Reset cooldown for new round
-
-        text = font.render(f"Active fires: {active_fires}/{len(fire_emitters)}", True, (255, 255, 255))
-        screen.blit(text, (10, 110))
-
-        text = font.render(f"Round: {round_number}", True, (255, 255, 255))
-        screen.blit(text, (10, 135))
-
-        if active_fires == 0 and len(fire_emitters) > 0:
-            if round_cooldown > 1:
-                seconds_left = (round_cooldown - 1) // 60 + 1
-                text = font.render(f"All fires extinguished! Next round in {seconds_left}s", True, (255, 255, 0))
-                screen.blit(text, (10, 160))
-            else:
-                text = font.render("Starting new round!", True, (255, 255, 0))
-                screen.blit(text, (10, 160))
-
-        pygame.display.flip()
-        clock.tick(60)
-
+                    if not fire.active:
+                        continue
+
+                    # Age the fire
+                    fire.age += 1
+                    fire.growth_timer += 1
+                    fire.spawn_timer += 1
+
+                    # Grow fire every 300 frames (5 seconds at 60fps)
+                    if fire.growth_timer >= 300:
+                        fire.max_particles = min(50, fire.max_particles + 5)  # Cap at 50
+                        fire.emit_rate = max(1, fire.emit_rate - 1)  # Faster emission, min 1
+                        fire.growth_timer = 0
+
+                    # Spawn new fire every 300 frames if no global cooldown
+                    if fire.spawn_timer >= 300 and fire_spawn_cooldown <= 0:
+                        # Try to spawn a new fire nearby
+                        attempts = 0
+                        while attempts < 10:  # Try 10 times to find a good spot
+                            new_x = fire.x + rng.randint(-100, 100)
+                            # Keep within bounds and away from burning fires
+                            if 50 <= new_x <= 750 and not fire_emitters.burning_near(new_x, 80):
+                                # Start smaller
+                                fire_emitters.light(new_x, ground_y - 10, rng.randint(10, 15), rng.randint(3, 5))
+                                fire_spawn_cooldown = 300  # 5 second global cooldown
+                                break
+                            attempts += 1
+                        fire.spawn_timer = 0
+
+                    # Emit fire particles, all fires at once below
+                    fire.emit_timer += 1
+                    if fire.emit_timer >= fire.emit_rate and fire.active_particles < fire.max_particles:
+                        emitting.append(fire)
+                        fire.emit_timer = 0
+
+                if emitting:
+                    emit_fire(emitting, rain_particles, np_rng)
+
+            with profiler.phase("extinguish"):
+                # Check for rain hitting fires (extinguishing them)
+                burning = fire_emitters.burning
+                if burning:
+                    fire_y = np.array([fire.y for fire in burning])
+                    # Only rain drops at fire height can reach a fire
+                    n = len(rain_particles)
+                    near = (rain_particles.of_type("rain")
+                            & (rain_particles.y[:n] > fire_y.min() - 30)
+                            & (rain_particles.y[:n] < fire_y.max() + 30))
+                    drops = np.flatnonzero(near)
+                    drop_hits, fire_hits = burning.x_index().pairs(rain_particles.x[drops], 20)
+                    close = np.abs(rain_particles.y[drops[drop_hits]] - fire_y[fire_hits]) < 30
+                    for fire in [burning.items[i] for i in np.unique(fire_hits[close]).tolist()]:
+                        fire_emitters.extinguish(fire)
+
+            with profiler.phase("ground"):
+                # Dry the gravelly ground
+                ground.dry()
+
+            with profiler.phase("update"):
+                # Remove dead particles and give fires back their particle slots
+                for fire, died in fire_emitters.owners.deaths(rain_particles.remove_dead()):
+                    fire.active_particles -= died
+
+                rain_particles.update(ground_y, ground)
+
+            with profiler.phase("rounds"):
+                active_fires = len(fire_emitters.burning)
+
+                # Check if all fires are extinguished - start new round
+                if active_fires == 0 and len(fire_emitters) > 0 and round_cooldown == 0:
+                    # Start round cooldown
+                    round_cooldown = 180  # 3 seconds at 60fps
+
+                # Create new round after cooldown
+                if active_fires == 0 and len(fire_emitters) > 0 and round_cooldown == 1:
+                    # Clear all old fire emitters
+                    fire_emitters.clear()
+                    round_number += 1
+
+                    # Create new round of fires (more fires each round)
+                    num_fires = min(10, 3 + round_number)
+                    for _ in range(num_fires):
+                        fire_x = rng.randint(50, 750)
+                        fire_emitters.light(fire_x, ground_y - 10, rng.randint(15, 25), rng.randint(2, 4))
+
+                    fire_spawn_cooldown = 0  # Reset cooldown for new round
+
+        if scheduler.render:
+            with profiler.phase("draw"):
+                screen.fill((40, 60, 80))  # Darker sky color
+
+                # Draw underground base layer
+                rechthoek(screen, 400, 575, 800, 50, (60, 40, 20))
+
+            with profiler.phase("ground"):
+                # Draw gravelly ground with small rectangles
+                ground.draw(screen)
+
+            with profiler.phase("draw"):
+                # Draw rain particles
+                rain_particles.draw(screen, cache=sprite_cache, interpolation=scheduler.alpha, lod=lod)
+
+                # Draw cloud particles at the current mouse position, also on
+                # frames without a simulation tick. The cloud is not kept on
+                # screen, so skip the particles that left it.
+                for cloud in cloud_particles:
+                    cloud.follow(mouse_x, mouse_y)
+                shown = lod.visible(screen, [cloud.x for cloud in cloud_particles], [cloud.y for cloud in cloud_particles],
+                                    [cloud.width for cloud in cloud_particles], [cloud.height for cloud in cloud_particles])
+                for cloud, show in zip(cloud_particles, shown.tolist()):
+                    if show:
+                        cloud.draw(screen, sprite_cache)
+
+            with profiler.phase("ui"):
+                # Draw UI
+                if mouse_y > 300:
+                    hint = "Hold mouse button to create fog!"
+                else:
+                    hint = "Hold mouse button to make it rain!"
+
+                active_fires = len(fire_emitters.burning)
+
+                lines = [
+                    (f"Particles: {len(rain_particles)}", (10, 10), (255, 255, 255)),
+                    (f"Cloud size: {cloud_size} | Rain intensity: {int(rain_chance * 100)}%", (10, 35), (255, 255, 255)),
+                    (hint, (10, 60), (255, 255, 255)),
+                    ("Press +/- to grow/shrink cloud", (10, 85), (255, 255, 255)),
+                    (f"Active fires: {active_fires}/{len(fire_emitters)}", (10, 110), (255, 255, 255)),
+                    (f"Round: {round_number}", (10, 135), (255, 255, 255)),
+                ]
+
+                if active_fires == 0 and len(fire_emitters) > 0:
+                    if round_cooldown > 1:
+                        seconds_left = (round_cooldown - 1) // 60 + 1
+                        lines.append((f"All fires extinguished! Next round in {seconds_left}s", (10, 160), (255, 255, 0)))
+                    else:
+                        lines.append(("Starting new round!", (10, 160), (255, 255, 0)))
+
+                if sprite_cache is not None:
+                    stats = sprite_cache.stats()
+                    lines.append((f"Sprite cache: {stats['sprites']} sprites, {stats['hits']} hits, "
+                                  f"{stats['misses']} misses, {stats['evictions']} evictions", (10, 185), (255, 255, 255)))
+
+                if lod.level:
+                    stats = lod.stats()
+                    lines.append((f"Detail level {stats['level']}: {stats['pixels']} pixels, {stats['rects']} plain rects, "
+                                  f"{stats['culled']} off-screen", (10, 210), (255, 255, 255)))
+
+                hud.draw(screen, lines)
+
+                profiler.draw(screen)
+
+            if on_frame:
+                on_frame(screen, len(rain_particles))
+
+            with profiler.phase("flip"):
+                pygame.display.flip()
+
+        clock.tick(fps)
+        lod.adapt(clock.get_rawtime())
+        profiler.end_frame()
+        frame += 1
+        if frame == frames:
+            running = False
+
+    profiler.close()
     pygame.quit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(sprite_cache=SpriteCache() if "--sprite-cache" in sys.argv else None,
+         profiler=FrameProfiler(csv_path=sys.argv[sys.argv.index("--profile-csv") + 1])
+         if "--profile-csv" in sys.argv else None)
\ No newline at end of file
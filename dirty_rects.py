@@ -0,0 +1,99 @@
+import numpy as np
+import pygame
+
+
+def rect_bounds(x, y, width, height, rotation=0, pad=2):
+    """Screen bounding boxes of rectangles drawn like rechthoek() draws them.
+
+    Every argument may be an array with one entry per rectangle. Returns a
+    list of ``[x, y, width, height]`` boxes, padded by ``pad`` pixels to
+    cover rounding of the corner points.
+    """
+    x = np.atleast_1d(np.asarray(x, dtype=np.float64))
+    n = len(x)
+    y = np.broadcast_to(np.asarray(y, dtype=np.float64), (n,))
+    half_w = np.broadcast_to(np.asarray(width, dtype=np.int64) // 2, (n,))
+    half_h = np.broadcast_to(np.asarray(height, dtype=np.int64) // 2, (n,))
+    rad = np.radians(np.broadcast_to(np.asarray(rotation, dtype=np.float64), (n,)))
+    cos_r, sin_r = np.abs(np.cos(rad)), np.abs(np.sin(rad))
+
+    # Half extents of the rotated rectangle along the screen axes
+    extent_x = half_w * cos_r + half_h * sin_r
+    extent_y = half_w * sin_r + half_h * cos_r
+    left = np.floor(x - extent_x) - pad
+    top = np.floor(y - extent_y) - pad
+    right = np.ceil(x + extent_x) + pad + 1
+    bottom = np.ceil(y + extent_y) + pad + 1
+    return np.column_stack([left, top, right - left, bottom - top]).astype(np.int64).tolist()
+
+
+class DirtyRenderer:
+    """Clears and presents only the parts of the screen that changed.
+
+    Each frame, ``clear()`` paints the background over the regions drawn in
+    the previous frame, the caller draws its objects and reports their
+    bounding boxes with ``mark()``, and ``present()`` sends only the old
+    and new regions to the display with pygame.display.update(). Screens
+    where too much changed for that to pay off are flipped whole.
+
+    Args:
+        surface: the display surface
+        background: color of the empty screen
+        max_rects: above this many regions the whole screen is cleared
+            and flipped
+        max_coverage: fraction of the screen area above which a flip is
+            cheaper than updating regions
+    """
+
+    def __init__(self, surface, background=(0, 0, 0), max_rects=512, max_coverage=0.5):
+        self.surface = surface
+        self.background = background
+        self.max_rects = max_rects
+        self.max_coverage = max_coverage
+        self.screen_area = surface.get_width() * surface.get_height()
+        self.previous = []
+        self.current = []
+        self.full = True  # Nothing is on screen yet
+        self.full_frames = 0
+        self.partial_frames = 0
+        self.presented_area = 0
+
+    def handle_event(self, event):
+        if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+            self.invalidate()
+
+    def invalidate(self):
+        """Redraw and present the whole screen next frame."""
+        self.full = True
+
+    def clear(self):
+        """Paint the background over everything drawn last frame."""
+        if self.full or len(self.previous) > self.max_rects:
+            self.surface.fill(self.background)
+        else:
+            for rect in self.previous:
+                self.surface.fill(self.background, rect)
+
+    def mark(self, rect):
+        """Report a region drawn this frame; None is ignored."""
+        if rect is not None:
+            self.current.append(rect)
+
+    def mark_all(self, rects):
+        self.current.extend(rects)
+
+    def present(self):
+        rects = self.previous + self.current
+        area = int(np.prod(np.asarray(rects).reshape(-1, 4)[:, 2:], axis=1).sum())
+        if self.full or len(rects) > self.max_rects or area > self.max_coverage * self.screen_area:
+            pygame.display.flip()
+            self.full_frames += 1
+            self.presented_area = self.screen_area
+        else:
+            if rects:
+                pygame.display.update(rects)
+            self.partial_frames += 1
+            self.presented_area = area
+        self.previous = self.current
+        self.current = []
+        self.full = False
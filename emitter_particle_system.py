@@ -1,67 +1,13 @@
 import pygame
-import math
 import random
+import sys
 
-def rechthoek(surface, x=100, y=100, width=80, height=40, color=(255, 255, 255), rotation=0):
-    """Draw a rectangle with position, color, and rotation.
-
-    Args:
-        surface: pygame surface to draw on
-        x, y: center position of rectangle
-        width, height: rectangle dimensions
-        color: RGB color tuple
-        rotation: rotation angle in degrees
-    """
-    if rotation == 0:
-        rect = pygame.Rect(x - width//2, y - height//2, width, height)
-        pygame.draw.rect(surface, color, rect)
-    else:
-        points = []
-        half_w, half_h = width // 2, height // 2
-        corners = [(-half_w, -half_h), (half_w, -half_h), (half_w, half_h), (-half_w, half_h)]
-
-        rad = math.radians(rotation)
-        cos_r, sin_r = math.cos(rad), math.sin(rad)
-
-        for cx, cy in corners:
-            rotated_x = cx * cos_r - cy * sin_r + x
-            rotated_y = cx * sin_r + cy * cos_r + y
-            points.append((rotated_x, rotated_y))
-
-        pygame.draw.polygon(surface, color, points)
-
-class Particle:
-    def __init__(self, x, y, vx, vy, width, height, color, ttl):
-        self.x = x
-        self.y = y
-        self.vx = vx
-        self.vy = vy
-        self.width = width
-        self.height = height
-        self.rotation = random.uniform(0, 360)
-        self.rotation_speed = random.uniform(-3, 3)
-        self.color = color
-        self.ttl = ttl
-        self.max_ttl = ttl
-
-    def update(self):
-        self.x += self.vx
-        self.y += self.vy
-        self.rotation += self.rotation_speed
-        self.ttl -= 1
-
-        alpha = max(0, self.ttl / self.max_ttl)
-        self.color = (
-            int(self.color[0] * alpha),
-            int(self.color[1] * alpha),
-            int(self.color[2] * alpha)
-        )
-
-    def is_dead(self):
-        return self.ttl <= 0
-
-    def draw(self, surface):
-        rechthoek(surface, self.x, self.y, self.width, self.height, self.color, self.rotation)
+from dirty_rects import DirtyRenderer
+from emitter_types import emit_particles
+from hud import Hud
+from particle_buffer import OwnerRegistry, ParticleBuffer
+from profiler import FrameProfiler
+from runtime import FixedStepScheduler, LiveInput
 
 class Emitter:
     def __init__(self, x, y, max_particles, emit_rate, particle_type):
@@ -72,57 +18,36 @@ class Emitter:
         self.particle_type = particle_type
         self.emit_timer = 0
         self.active_particles = 0
+        self.handle = -1  # Owner handle of this emitter's particles
 
     def can_emit(self):
         return self.active_particles < self.max_particles
 
-    def particle_died(self):
-        self.active_particles -= 1
+    def particle_died(self, count=1):
+        self.active_particles -= count
 
-    def particle_created(self):
-        self.active_particles += 1
+    def particle_created(self, count=1):
+        self.active_particles += count
 
-    def emit_particle(self):
+    def ready(self):
+        """Advance the emit timer; returns whether to emit a particle this tick."""
         self.emit_timer += 1
         if self.emit_timer < self.emit_rate:
-            return None
+            return False
 
         self.emit_timer = 0
+        return self.can_emit()
 
-        if not self.can_emit():
-            return None
-
-        if self.particle_type == "fountain":
-            vx = random.uniform(-1, 1)
-            vy = random.uniform(-3, -1)
-            color = (random.randint(100, 255), random.randint(100, 255), 255)
-            ttl = random.randint(120, 180)
-            size = random.randint(6, 12)
-
-        elif self.particle_type == "explosion":
-            angle = random.uniform(0, 2 * math.pi)
-            speed = random.uniform(2, 5)
-            vx = math.cos(angle) * speed
-            vy = math.sin(angle) * speed
-            color = (255, random.randint(100, 255), random.randint(0, 100))
-            ttl = random.randint(60, 120)
-            size = random.randint(8, 16)
-
-        elif self.particle_type == "smoke":
-            vx = random.uniform(-0.5, 0.5)
-            vy = random.uniform(-1.5, -0.5)
-            color = (random.randint(150, 200), random.randint(150, 200), random.randint(150, 200))
-            ttl = random.randint(180, 300)
-            size = random.randint(10, 20)
-
-        self.particle_created()
-        return Particle(self.x, self.y, vx, vy, size, size, color, ttl)
-
-def main():
+def main(frames=None, rng=random, input_source=None, fps=60, on_frame=None, profiler=None):
     pygame.init()
     screen = pygame.display.set_mode((800, 600))
     pygame.display.set_caption("Particle System with 3 Emitters")
     clock = pygame.time.Clock()
+    input_source = input_source or LiveInput()
+    scheduler = FixedStepScheduler(60, lockstep=not fps)
+    profiler = profiler or FrameProfiler()
+    hud = Hud()
+    renderer = DirtyRenderer(screen, (20, 20, 40))
 
     emitters = [
         Emitter(200, 550, 50, 3, "fountain"),
@@ -130,46 +55,67 @@ def main():
         Emitter(600, 100, 40, 4, "smoke")
     ]
 
-    particles = []
+    particles = ParticleBuffer(rng=rng)
+    # Random parameters of new particles come in batches from a NumPy generator
+    np_rng = particles.np_rng
+    emitter_owners = OwnerRegistry()
+    for emitter in emitters:
+        emitter.handle = emitter_owners.register(emitter)
 
+    frame = 0
     running = True
     while running:
-        for event in pygame.event.get():
+        for event in input_source.events():
+            profiler.handle_event(event)
+            renderer.handle_event(event)
             if event.type == pygame.QUIT:
                 running = False
 
-        screen.fill((20, 20, 40))
+        # Simulate in fixed ticks, however fast frames are drawn
+        for _ in range(scheduler.advance()):
+            with profiler.phase("emit"):
+                emit_particles(emitters, particles, np_rng)
+
+                for emitter, died in emitter_owners.deaths(particles.remove_dead()):
+                    emitter.particle_died(died)
+
+            with profiler.phase("update"):
+                particles.update()
+                particles.darken()
 
-        for emitter in emitters:
-            new_particle = emitter.emit_particle()
-            if new_particle:
-                particles.append(new_particle)
+        if scheduler.render:
+            with profiler.phase("draw"):
+                renderer.clear()
+                particles.draw(screen, alpha=False, interpolation=scheduler.alpha)
+                renderer.mark_all(particles.bounds(scheduler.alpha))
 
-        dead_particles = [p for p in particles if p.is_dead()]
-        for emitter in emitters:
-            for dead_particle in dead_particles:
-                emitter.particle_died()
+            with profiler.phase("ui"):
+                total_particles = len(particles)
+                lines = [(f"Particles: {total_particles}", (10, 10), (255, 255, 255))]
 
-        particles = [p for p in particles if not p.is_dead()]
+                for i, emitter in enumerate(emitters):
+                    active = emitter.active_particles
+                    lines.append((f"Emitter {i+1}: {active}/{emitter.max_particles} active",
+                                  (10, 40 + i * 25), (255, 255, 255)))
 
-        for particle in particles:
-            particle.update()
-            particle.draw(screen)
+                renderer.mark(hud.draw(screen, lines))
+                renderer.mark(profiler.draw(screen))
 
-        font = pygame.font.Font(None, 24)
-        total_particles = len(particles)
-        text = font.render(f"Particles: {total_particles}", True, (255, 255, 255))
-        screen.blit(text, (10, 10))
+            if on_frame:
+                on_frame(screen, len(particles))
 
-        for i, emitter in enumerate(emitters):
-            active = emitter.active_particles
-            text = font.render(f"Emitter {i+1}: {active}/{emitter.max_particles} active", True, (255, 255, 255))
-            screen.blit(text, (10, 40 + i * 25))
+            with profiler.phase("flip"):
+                renderer.present()
 
-        pygame.display.flip()
-        clock.tick(60)
+        clock.tick(fps)
+        profiler.end_frame()
+        frame += 1
+        if frame == frames:
+            running = False
 
+    profiler.close()
     pygame.quit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(profiler=FrameProfiler(csv_path=sys.argv[sys.argv.index("--profile-csv") + 1])
+         if "--profile-csv" in sys.argv else None)
\ No newline at end of file
@@ -0,0 +1,157 @@
+import math
+
+import numpy as np
+
+from particle_buffer import TYPE_CODES
+from spawn_ranges import SpawnRanges
+
+
+class EmitterType:
+    """Parameters of one kind of emitter, as plain data.
+
+    Args:
+        name: name emitters use to refer to this type
+        velocity: ranges ``((low, high), (low, high))`` of vx and vy, or
+            with ``polar`` of the angle (radians) and the speed
+        color: lowest and highest RGB color, sampled per channel
+        ttl: range of particle lifetimes, in ticks
+        size: range of particle sizes (width and height), in pixels
+        gravity: range of the particles' gravity
+        particle_type: ParticleBuffer type of the particles
+        polar: whether ``velocity`` holds an angle and a speed
+        burst: particles emitted at once each time the emitter fires
+    """
+
+    def __init__(self, name, velocity, color, ttl, size, gravity=(0.0, 0.0), particle_type="normal",
+                 polar=False, burst=1):
+        self.name = name
+        self.ranges = SpawnRanges(v0=velocity[0], v1=velocity[1], color=color, ttl=ttl, size=size, gravity=gravity)
+        self.particle_type = particle_type
+        self.polar = polar
+        self.burst = burst
+
+
+class EmitterRegistry:
+    """Emitter types by name, sampled together.
+
+    The SpawnRanges of all registered types are stacked, so particles of
+    any mix of types are drawn with a single generator call: every
+    particle picks its type's ranges, and adding a type adds ranges to the
+    stack instead of another branch.
+
+    Args:
+        types: EmitterTypes to register, in order
+    """
+
+    def __init__(self, types=()):
+        self.types = {}
+        self._table = None
+        for emitter_type in types:
+            self.register(emitter_type)
+
+    def __getitem__(self, name):
+        return self.types[name]
+
+    def __len__(self):
+        return len(self.types)
+
+    @property
+    def names(self):
+        return list(self.types)
+
+    def register(self, emitter_type):
+        """Add or replace an emitter type; returns it."""
+        self.types[emitter_type.name] = emitter_type
+        self._table = None
+        return emitter_type
+
+    def index(self, name):
+        """Position of a type in the stacked ranges."""
+        if self._table is None:
+            self._build()
+        return self._table[0][name]
+
+    def _build(self):
+        types = list(self.types.values())
+        columns = {emitter_type.name: column for column, emitter_type in enumerate(types)}
+        ranges = SpawnRanges.stack([emitter_type.ranges for emitter_type in types])
+        polar = np.array([emitter_type.polar for emitter_type in types])
+        codes = np.array([TYPE_CODES[emitter_type.particle_type] for emitter_type in types])
+        self._table = columns, ranges, polar, codes
+
+    def sample(self, np_rng, columns):
+        """Draw particles of the types in ``columns``, one entry per particle.
+
+        Returns arrays ``(vx, vy, color, ttl, size, gravity, particle_type)``
+        where particle_type holds ParticleBuffer type codes.
+        """
+        if self._table is None:
+            self._build()
+        _, ranges, polar, codes = self._table
+        spawn = ranges.draw(np_rng, len(columns), columns)
+
+        vx, vy = spawn['v0'], spawn['v1']
+        polar = polar[columns]
+        if polar.any():
+            # Polar types hold an angle and a speed instead of vx and vy
+            vx, vy = np.where(polar, np.cos(vx) * vy, vx), np.where(polar, np.sin(vx) * vy, vy)
+        return vx, vy, spawn['color'], spawn['ttl'], spawn['size'], spawn['gravity'], codes[columns]
+
+
+def full_circle(speed):
+    """Polar velocity ranges for any direction at a speed in ``speed``."""
+    return ((0.0, 2 * math.pi), speed)
+
+
+# The emitter types of the demos; explosions go off in bursts
+EMITTER_TYPES = EmitterRegistry([
+    EmitterType("fountain", velocity=((-1.0, 1.0), (-3.0, -1.0)), color=((100, 100, 255), (255, 255, 255)),
+                ttl=(120, 180), size=(6, 12)),
+    EmitterType("explosion", velocity=full_circle((2.0, 5.0)), polar=True, color=((255, 100, 0), (255, 255, 100)),
+                ttl=(60, 120), size=(8, 16), burst=12),
+    EmitterType("smoke", velocity=((-0.5, 0.5), (-1.5, -0.5)), color=((150, 150, 150), (200, 200, 200)),
+                ttl=(180, 300), size=(10, 20)),
+    EmitterType("rain", velocity=((-0.5, 0.5), (-3.0, -0.5)), color=((100, 150, 255), (100, 150, 255)),
+                ttl=(200, 400), size=(3, 8), gravity=(0.05, 0.15), particle_type="rain"),
+    EmitterType("cloud", velocity=((-0.3, 0.3), (-0.2, 0.2)), color=((220, 220, 230), (220, 220, 230)),
+                ttl=(300, 600), size=(15, 30), particle_type="cloud"),
+])
+
+
+def emit_particles(emitters, particles, np_rng, budget=None, types=EMITTER_TYPES):
+    """Let every emitter that is due this tick emit its burst of particles.
+
+    Emitters need ``x``, ``y``, ``handle``, ``particle_type``,
+    ``max_particles`` and ``active_particles``, a ``ready()`` that advances
+    their timer and a ``particle_created(count)``. The particles of all
+    emitters, whatever their type, are drawn from ``np_rng`` in one go and
+    added to the pool with a single add_many() call. The budget's grants
+    add up over the emitters, so together they stay within its maximum.
+    """
+    emitting, counts = [], []
+    for emitter in emitters:
+        if emitter.ready():
+            count = min(types[emitter.particle_type].burst, emitter.max_particles - emitter.active_particles)
+            if budget is not None:
+                count = budget.grant(emitter.particle_type, count)
+            if count:
+                emitting.append(emitter)
+                counts.append(count)
+    if not emitting:
+        return
+
+    columns = np.repeat([types.index(emitter.particle_type) for emitter in emitting], counts)
+    vx, vy, color, ttl, size, gravity, particle_type = types.sample(np_rng, columns)
+    if budget is not None:
+        ttl = budget.ttl(ttl)
+    added = len(particles.add_many(
+        np.repeat([emitter.x for emitter in emitting], counts), np.repeat([emitter.y for emitter in emitting], counts),
+        vx, vy, size, size, color, ttl, gravity, particle_type,
+        np.repeat([emitter.handle for emitter in emitting], counts)
+    ))
+    if budget is not None:
+        budget.commit()
+    for emitter, count in zip(emitting, counts):
+        count = min(count, added)
+        emitter.particle_created(count)
+        added -= count
@@ -0,0 +1,91 @@
+import random
+
+import numpy as np
+import pygame
+
+# Color key for the empty parts of the cached ground layer
+TRANSPARENT = (255, 0, 255)
+
+
+class Ground:
+    """A row of small gravel blocks with fixed random widths and heights.
+
+    Blocks are stored as arrays, together with a per-pixel lookup of the
+    block under every screen column, so finding the block a rain drop lands
+    on is a single array index instead of a scan over all blocks.
+
+    The blocks are rendered once to a cached layer. Each frame only the
+    columns whose wetness color changed are redrawn, and the layer is put
+    on screen with a single blit.
+    """
+
+    def __init__(self, ground_y, screen_width=800, rng=random):
+        self.ground_y = ground_y
+
+        widths, heights = [], []
+        x = 0
+        while x < screen_width:
+            width = rng.randint(4, 16)
+            widths.append(width)
+            heights.append(rng.randint(3, 12))
+            x += width
+
+        self.width = np.array(widths)
+        self.height = np.array(heights)
+        left = np.cumsum(self.width) - self.width
+        self.x = left + self.width // 2
+        self.wetness = np.zeros(len(widths))
+
+        # Index of the block under each pixel column
+        self.column_block = np.repeat(np.arange(len(widths)), self.width)
+
+        # Blocks are centered on ground_y like rechthoek() draws them, so
+        # odd heights reach one pixel below it
+        self.top = ground_y - self.height // 2 - self.height // 2
+        self.layer_y = int(self.top.min())
+        layer_height = int((self.top + self.height).max()) - self.layer_y
+        self.layer = pygame.Surface((int(self.width.sum()), layer_height))
+        self.layer.set_colorkey(TRANSPARENT)
+        self.layer.fill(TRANSPARENT)
+        self.drawn_colors = np.full((len(widths), 3), -1)
+        self.redrawn = 0
+
+    def __len__(self):
+        return len(self.width)
+
+    def block_at(self, xs):
+        """Block index under each x position, or -1 where there is none."""
+        columns = np.floor(np.asarray(xs)).astype(np.int64)
+        inside = (columns >= 0) & (columns < len(self.column_block))
+        return np.where(inside, self.column_block[np.clip(columns, 0, len(self.column_block) - 1)], -1)
+
+    def wet(self, xs):
+        """Make the blocks under the given rain impact positions wetter."""
+        blocks = self.block_at(xs)
+        np.add.at(self.wetness, blocks[blocks >= 0], 10)
+        np.minimum(self.wetness, 100, out=self.wetness)
+
+    def dry(self):
+        """Slowly dry the ground over time."""
+        np.maximum(self.wetness - 0.2, 0, out=self.wetness)
+
+    def colors(self):
+        # More blue when wet
+        base_gray = 80
+        blue_amount = (self.wetness * 1.5).astype(np.int64)
+        gray = np.maximum(0, base_gray - blue_amount // 2)
+        return np.column_stack([gray, gray, np.minimum(255, base_gray + blue_amount)])
+
+    def draw(self, surface):
+        colors = self.colors()
+        changed = np.flatnonzero(np.any(colors != self.drawn_colors, axis=1))
+        if changed.size:
+            self.drawn_colors[changed] = colors[changed]
+            layer_height = self.layer.get_height()
+            blocks = np.column_stack([self.x - self.width // 2, self.top - self.layer_y,
+                                      self.width, self.height, colors])[changed].tolist()
+            for left, top, width, height, r, g, b in blocks:
+                self.layer.fill(TRANSPARENT, (left, 0, width, layer_height))
+                self.layer.fill((r, g, b), (left, top, width, height))
+        self.redrawn = len(changed)
+        surface.blit(self.layer, (0, self.layer_y))
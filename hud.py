@@ -0,0 +1,88 @@
+from collections import OrderedDict
+
+import pygame
+
+
+class Hud:
+    """Lines of on-screen text, rendered only when they change.
+
+    The font is loaded once and every rendered string is kept in a small
+    LRU cache, so a value that flips back and forth is not rendered again.
+    All lines are composited into one persistent layer. When a line's
+    text, position or color differs from the previous frame only its area
+    of the layer is redrawn; unchanged frames cost a single blit.
+
+    Args:
+        font_size: size of the default pygame font
+        max_cached: number of rendered strings to keep
+        slack: extra layer width, in pixels, for lines that grow
+    """
+
+    def __init__(self, font_size=24, max_cached=256, slack=100):
+        self.font = pygame.font.Font(None, font_size)
+        self.max_cached = max_cached
+        self.texts = OrderedDict()
+        self.slack = slack
+        self.lines = None
+        self.rects = []
+        self.layer = None
+        self.bounds = pygame.Rect(0, 0, 0, 0)
+        self.rebuilds = 0
+        self.updates = 0
+
+    def text(self, text, color=(255, 255, 255)):
+        """Rendered surface for a string, from the cache when possible."""
+        key = (text, color)
+        surface = self.texts.get(key)
+        if surface is not None:
+            self.texts.move_to_end(key)
+            return surface
+
+        surface = self.font.render(text, True, color)
+        self.texts[key] = surface
+        if len(self.texts) > self.max_cached:
+            self.texts.popitem(last=False)
+        return surface
+
+    def draw(self, surface, lines):
+        """Draw ``(text, (x, y), color)`` lines, updating the layer only on change.
+
+        Returns the screen area covered, or None when there are no lines.
+        """
+        if lines != self.lines:
+            self._update(lines)
+        if self.layer is not None:
+            return surface.blit(self.layer, self.bounds)
+
+    def _update(self, lines):
+        rendered = []
+        for text, pos, color in lines:
+            surface = self.text(text, color)
+            rendered.append((surface, pygame.Rect(pos, surface.get_size())))
+        old_lines, old_rects = self.lines or [], self.rects
+        self.lines = lines
+        self.rects = [rect for _, rect in rendered]
+        if not rendered:
+            self.layer = None
+            return
+
+        if (self.layer is None or len(old_rects) != len(self.rects)
+                or not all(self.bounds.contains(rect) for rect in self.rects)):
+            # Leave room on the right so growing numbers still fit
+            self.bounds = self.rects[0].unionall(self.rects)
+            self.bounds.width += self.slack
+            self.layer = pygame.Surface(self.bounds.size, pygame.SRCALPHA)
+            dirty = self.layer.get_rect()
+            self.rebuilds += 1
+        else:
+            changed = [old.union(new) for old, new, line, previous in
+                       zip(old_rects, self.rects, lines, old_lines) if line != previous]
+            dirty = changed[0].unionall(changed).move(-self.bounds.x, -self.bounds.y)
+            self.updates += 1
+
+        # Clear and redraw only the changed area of the layer
+        self.layer.set_clip(dirty)
+        self.layer.fill((0, 0, 0, 0))
+        for text, rect in rendered:
+            self.layer.blit(text, rect.move(-self.bounds.x, -self.bounds.y))
+        self.layer.set_clip(None)
@@ -0,0 +1,145 @@
+import numpy as np
+import pygame
+
+from rechthoek_batch import rechthoek_batch
+
+
+class LevelOfDetail:
+    """Culls off-screen particles and simplifies the ones that hardly show.
+
+    Particles whose rotated rectangle lies entirely outside the surface's
+    clip area, and fully transparent ones, are dropped before any drawing
+    work. Of the rest, small or
+    faint particles are drawn cheaper, depending on the detail level:
+
+    - as an axis-aligned rectangle without rotation, when the longest side
+      is at most ``rect_size`` or the alpha at most ``rect_alpha``;
+    - as a single blended pixel at the center, when the longest side is at
+      most ``pixel_size`` or the alpha at most ``pixel_alpha``.
+
+    Level 0 draws every visible particle in full detail. With a target
+    frame time, ``adapt()`` raises the level while the smoothed frame time
+    is over it and lowers it again once there is time to spare.
+
+    Args:
+        target_ms: frame time to hold, or None to keep the level fixed
+        level: starting detail level, an index into LEVELS
+        patience: frames in a row with the smoothed time over (or well
+            under) the target before the level changes
+        history: list to append the level every frame was drawn with to,
+            so the run can be replayed with ReplayLevelOfDetail
+    """
+
+    # (rect_size, rect_alpha, pixel_size, pixel_alpha) per level
+    LEVELS = (
+        (0, 0, 0, 0),
+        (6, 32, 0, 8),
+        (10, 64, 3, 24),
+        (16, 128, 6, 48),
+        (1 << 30, 255, 10, 96),
+    )
+
+    def __init__(self, target_ms=None, level=0, patience=30, history=None):
+        if not 0 <= level < len(self.LEVELS):
+            raise ValueError(f"level must be between 0 and {len(self.LEVELS) - 1}, not {level}")
+        self.target_ms = target_ms
+        self.level = level
+        self.patience = patience
+        self.average = None
+        self.over = 0
+        self.under = 0
+        self.counts = {'culled': 0, 'pixels': 0, 'rects': 0, 'full': 0}
+        self.history = history
+
+    def adapt(self, frame_ms):
+        """Take the time the last frame took and change the level if needed."""
+        if self.history is not None:
+            self.history.append(self.level)
+        if self.target_ms is None:
+            return
+        # Smooth out frames that skip drawing, which cost next to nothing
+        self.average = frame_ms if self.average is None else self.average + 0.1 * (frame_ms - self.average)
+        self.over = self.over + 1 if self.average > self.target_ms else 0
+        # Only give detail back with a clear margin, or the level would flap
+        self.under = self.under + 1 if self.average < 0.7 * self.target_ms else 0
+        if self.over >= self.patience and self.level < len(self.LEVELS) - 1:
+            self.level += 1
+            self.over = 0
+        elif self.under >= 4 * self.patience and self.level > 0:
+            self.level -= 1
+            self.under = 0
+
+    def visible(self, surface, x, y, width, height):
+        """Boolean mask of the rectangles that may cover pixels of the clip area.
+
+        Uses the circle around each rectangle, so it holds for any rotation.
+        """
+        clip = surface.get_clip()
+        reach = np.hypot(np.asarray(width) // 2, np.asarray(height) // 2) + 2
+        x, y = np.asarray(x), np.asarray(y)
+        return ((x + reach >= clip.left) & (x - reach < clip.right)
+                & (y + reach >= clip.top) & (y - reach < clip.bottom))
+
+    def draw(self, surface, x, y, width, height, color, rotation, alpha=None, cache=None):
+        """Draw particles like rechthoek_batch(), culled and simplified by level.
+
+        Pixels are drawn first, then simplified rectangles, then the rest,
+        so the order within each group is kept.
+        """
+        n = len(x)
+        width = np.broadcast_to(width, (n,))
+        height = np.broadcast_to(height, (n,))
+        shown = self.visible(surface, x, y, width, height)
+        if alpha is not None:
+            shown &= alpha > 0
+        shown = np.flatnonzero(shown)
+        self.counts['culled'] = n - len(shown)
+        x, y, width, height = x[shown], y[shown], width[shown], height[shown]
+        color, rotation = color[shown], rotation[shown]
+        alpha = np.full(len(shown), 255) if alpha is None else alpha[shown]
+
+        rect_size, rect_alpha, pixel_size, pixel_alpha = self.LEVELS[self.level]
+        size = np.maximum(width, height)
+        pixel = (size <= pixel_size) | (alpha <= pixel_alpha)
+        rect = ~pixel & ((size <= rect_size) | (alpha <= rect_alpha))
+        full = ~pixel & ~rect
+        self.counts['pixels'] = int(np.count_nonzero(pixel))
+        self.counts['rects'] = int(np.count_nonzero(rect))
+        self.counts['full'] = int(np.count_nonzero(full))
+
+        if self.counts['pixels']:
+            self._draw_pixels(surface, x[pixel], y[pixel], color[pixel], alpha[pixel])
+        if self.counts['rects']:
+            rechthoek_batch(surface, x[rect], y[rect], width[rect], height[rect], color[rect], 0, alpha[rect], cache)
+        if self.counts['full']:
+            rechthoek_batch(surface, x[full], y[full], width[full], height[full], color[full],
+                            rotation[full], alpha[full], cache)
+
+    def _draw_pixels(self, surface, x, y, color, alpha):
+        clip = surface.get_clip()
+        px, py = x.astype(np.int64), y.astype(np.int64)
+        inside = (px >= clip.left) & (px < clip.right) & (py >= clip.top) & (py < clip.bottom)
+        px, py = px[inside], py[inside]
+        weight = alpha[inside, None] / 255
+        pixels = pygame.surfarray.pixels3d(surface)
+        # Blend every pixel in one go; when particles share a pixel the last one wins
+        pixels[px, py] = pixels[px, py] + (color[inside].astype(np.float64) - pixels[px, py]) * weight
+        del pixels  # Unlocks the surface
+
+    def stats(self):
+        return dict(self.counts, level=self.level)
+
+
+class ReplayLevelOfDetail(LevelOfDetail):
+    """Draws every frame at the level of a recorded LevelOfDetail history.
+
+    Frames then look as in the recorded run, however fast the replay
+    goes. Frames beyond the recording keep the last level.
+    """
+
+    def __init__(self, history):
+        self.recorded = iter(history)
+        super().__init__(level=next(self.recorded, 0))
+
+    def adapt(self, frame_ms):
+        self.level = next(self.recorded, self.level)
@@ -1,8 +1,24 @@
 import pygame
 import math
 import random
-
-def rechthoek(surface, x=100, y=100, width=80, height=40, color=(255, 255, 255), rotation=0, alpha=255):
+import sys
+
+import numpy as np
+
+from budget import ParticleBudget
+from emitter_types import EMITTER_TYPES, emit_particles
+from ground import Ground
+from parallel_engine import ParallelUpdater, SharedParticleBuffer
+from hud import Hud
+from lod import LevelOfDetail
+from particle_buffer import OwnerRegistry, ParticleBuffer
+from profiler import FrameProfiler
+from sprite_cache import SpriteCache
+from runtime import FixedStepScheduler, LiveInput
+from spawn_ranges import SpawnRanges
+from surface_pool import scratch_pool
+
+def rechthoek(surface, x=100, y=100, width=80, height=40, color=(255, 255, 255), rotation=0, alpha=255, cache=None):
     """Draw a rectangle with position, color, rotation, and transparency.
 
     Args:
@@ -12,8 +28,16 @@ def rechthoek(surface, x=100, y=100, width=80, height=40, color=(255, 255, 255),
         color: RGB color tuple
         rotation: rotation angle in degrees
         alpha: transparency (0-255)
+        cache: optional SpriteCache; rotation and alpha are snapped to its
+            steps and the rectangle is blitted from a cached sprite
     """
-    temp_surface = pygame.Surface((width + 10, height + 10), pygame.SRCALPHA)
+    if cache is not None:
+        step, level = cache.quantize(rotation, alpha)
+        sprite = cache.get(width, height, tuple(color), int(step), int(level))
+        surface.blit(sprite, (x - (width + 10) // 2, y - (height + 10) // 2))
+        return
+
+    temp_surface = scratch_pool.acquire(width + 10, height + 10)
 
     if rotation == 0:
         rect = pygame.Rect(5, 5, width, height)
@@ -33,77 +57,49 @@ def rechthoek(surface, x=100, y=100, width=80, height=40, color=(255, 255, 255),
 
         pygame.draw.polygon(temp_surface, (*color, alpha), points)
 
-    surface.blit(temp_surface, (x - (width + 10) // 2, y - (height + 10) // 2))
-
-class Particle:
-    def __init__(self, x, y, vx, vy, width, height, color, ttl, gravity=0, particle_type="normal"):
-        self.x = x
-        self.y = y
-        self.vx = vx
-        self.vy = vy
-        self.width = width
-        self.height = height
-        self.rotation = random.uniform(0, 360)
-        self.rotation_speed = random.uniform(-3, 3)
-        self.color = color
-        self.ttl = ttl
-        self.max_ttl = ttl
-        self.gravity = gravity
-        self.particle_type = particle_type
-        self.rain_timer = random.randint(0, 60)  # Random delay before dropping rain
-
-    def update(self, ground_y=None, ground_rects=None):
-        self.x += self.vx
-        self.y += self.vy
-        self.vy += self.gravity
-        self.rotation += self.rotation_speed
-        self.ttl -= 1
+    surface.blit(temp_surface, (x - (width + 10) // 2, y - (height + 10) // 2), (0, 0, width + 10, height + 10))
+    scratch_pool.release_all()
 
-        # Cloud particles occasionally drop rain
-        new_rain_particles = []
-        if self.particle_type == "cloud":
-            self.rain_timer -= 1
-            if self.rain_timer <= 0 and random.random() < 0.1:  # 10% chance when timer reaches 0
-                # Create a rain particle below the cloud
-                rain_x = self.x + random.uniform(-self.width//2, self.width//2)
-                rain_y = self.y + self.height//2
-                rain_particle = Particle(
-                    rain_x, rain_y,
-                    random.uniform(-0.5, 0.5), random.uniform(0.5, 3),
-                    random.randint(3, 6), random.randint(8, 12),
-                    (100, 150, 255), random.randint(200, 400),
-                    random.uniform(0.05, 0.15), "rain"
-                )
-                new_rain_particles.append(rain_particle)
-                self.rain_timer = random.randint(30, 90)  # Reset timer
-
-        # Check for ground collision for rain particles
-        if ground_y and self.gravity > 0 and self.y >= ground_y:
-            self.y = ground_y
-            self.vy = -abs(self.vy) * 0.3  # Bounce up with reduced velocity
-            self.vx *= 0.8  # Reduce horizontal velocity
-            self.ttl = min(self.ttl, 30)  # Force death soon after bouncing
-
-            # Make ground blocks wetter when rain hits
-            if ground_rects:
-                for rect in ground_rects:
-                    rect_left = rect['x'] - rect['width'] // 2
-                    rect_right = rect['x'] + rect['width'] // 2
-                    if rect_left <= self.x <= rect_right:
-                        rect['wetness'] = min(rect['wetness'] + 10, 100)
-                        break
-
-        return new_rain_particles
+# Spawn priorities for the particle budget; the least important go first
+SPAWN_PRIORITIES = {
+    "cloud rain": 0,
+    "smoke": 1,
+    "rain": 1,
+    "fountain": 2,
+    "cloud": 2,
+    "explosion": 3,
+}
 
-    def get_alpha(self):
-        return max(0, int(255 * (self.ttl / self.max_ttl)))
+# Value ranges of rain dropped by cloud particles
+CLOUD_RAIN = SpawnRanges(offset=(-1.0, 1.0), vx=(-0.5, 0.5), vy=(0.5, 3.0), width=(3, 6), height=(8, 12),
+                         ttl=(200, 400), gravity=(0.05, 0.15), timer=(30, 90))
 
-    def is_dead(self):
-        return self.ttl <= 0
+def drop_cloud_rain(particles, np_rng, budget=None):
+    """Let cloud particles occasionally drop a rain particle below them.
 
-    def draw(self, surface):
-        alpha = self.get_alpha()
-        rechthoek(surface, self.x, self.y, self.width, self.height, self.color, self.rotation, alpha)
+    All drops of a tick are drawn from ``np_rng`` and added as one batch.
+    """
+    clouds = np.flatnonzero(particles.of_type("cloud"))
+    particles.rain_timer[clouds] -= 1
+    ready = clouds[particles.rain_timer[clouds] <= 0]
+    raining = ready[np_rng.random(len(ready)) < 0.1]  # 10% chance when timer reaches 0
+    if budget is not None:
+        raining = raining[:budget.grant("cloud rain", len(raining))]
+    if not len(raining):
+        return
+
+    # Create rain particles below the clouds
+    rain = CLOUD_RAIN.draw(np_rng, len(raining))
+    particles.add_many(
+        particles.x[raining] + rain['offset'] * (particles.width[raining] // 2),
+        particles.y[raining] + particles.height[raining] // 2,
+        rain['vx'], rain['vy'], rain['width'], rain['height'],
+        (100, 150, 255), budget.ttl(rain['ttl']) if budget is not None else rain['ttl'],
+        rain['gravity'], "rain"
+    )
+    if budget is not None:
+        budget.commit()
+    particles.rain_timer[raining] = rain['timer']  # Reset timers
 
 class Emitter:
     def __init__(self, x, y, max_particles, emit_rate, particle_type, ttl):
@@ -114,17 +110,18 @@ class Emitter:
         self.particle_type = particle_type
         self.emit_timer = 0
         self.active_particles = 0
+        self.handle = -1  # Owner handle of this emitter's particles
         self.ttl = ttl
         self.max_ttl = ttl
 
     def can_emit(self):
         return self.active_particles < self.max_particles and self.ttl > 0
 
-    def particle_died(self):
-        self.active_particles -= 1
+    def particle_died(self, count=1):
+        self.active_particles -= count
 
-    def particle_created(self):
-        self.active_particles += 1
+    def particle_created(self, count=1):
+        self.active_particles += count
 
     def update(self):
         self.ttl -= 1
@@ -135,180 +132,178 @@ class Emitter:
     def get_alpha(self):
         return max(0, self.ttl / self.max_ttl)
 
-    def emit_particle(self):
+    def ready(self):
+        """Advance the emit timer; returns whether to emit this tick."""
         self.emit_timer += 1
         if self.emit_timer < self.emit_rate:
-            return None
+            return False
 
         self.emit_timer = 0
-
-        if not self.can_emit():
-            return None
-
-        alpha = self.get_alpha()
-
-        if self.particle_type == "fountain":
-            vx = random.uniform(-1, 1)
-            vy = random.uniform(-3, -1)
-            color = (random.randint(100, 255), random.randint(100, 255), 255)
-            ttl = random.randint(120, 180)
-            size = random.randint(6, 12)
-
-        elif self.particle_type == "explosion":
-            angle = random.uniform(0, 2 * math.pi)
-            speed = random.uniform(2, 5)
-            vx = math.cos(angle) * speed
-            vy = math.sin(angle) * speed
-            color = (255, random.randint(100, 255), random.randint(0, 100))
-            ttl = random.randint(60, 120)
-            size = random.randint(8, 16)
-
-        elif self.particle_type == "smoke":
-            vx = random.uniform(-0.5, 0.5)
-            vy = random.uniform(-1.5, -0.5)
-            color = (random.randint(150, 200), random.randint(150, 200), random.randint(150, 200))
-            ttl = random.randint(180, 300)
-            size = random.randint(10, 20)
-            gravity = 0
-
-        elif self.particle_type == "rain":
-            vx = random.uniform(-0.5, 0.5)
-            vy = random.uniform(-3, -0.5)
-            color = (100, 150, 255)
-            ttl = random.randint(200, 400)
-            size = random.randint(3, 8)
-            gravity = random.uniform(0.05, 0.15)
-
-        elif self.particle_type == "cloud":
-            vx = random.uniform(-0.3, 0.3)
-            vy = random.uniform(-0.2, 0.2)
-            color = (220, 220, 230)
-            ttl = random.randint(300, 600)
-            size = random.randint(15, 30)
-            gravity = 0
-
-        self.particle_created()
-        if self.particle_type == "rain":
-            return Particle(self.x, self.y, vx, vy, size, size, color, ttl, gravity, "rain")
-        elif self.particle_type == "cloud":
-            return Particle(self.x, self.y, vx, vy, size, size, color, ttl, gravity, "cloud")
-        else:
-            return Particle(self.x, self.y, vx, vy, size, size, color, ttl)
+        return self.can_emit()
 
     def draw_emitter(self, surface):
         alpha = self.get_alpha()
         color = (int(255 * alpha), int(255 * alpha), int(255 * alpha))
         rechthoek(surface, self.x, self.y, 20, 20, color, 0)
 
-def main():
+# Value ranges of the cloud particles created by a click in cloud mode
+CLICK_CLOUD = SpawnRanges(offset_x=(-50.0, 50.0), offset_y=(-30.0, 30.0), vx=(-0.3, 0.3), vy=(-0.2, 0.2),
+                          width=(15, 30), height=(15, 30), ttl=(300, 600))
+
+def main(frames=None, rng=random, input_source=None, fps=60, on_frame=None, sprite_cache=None, workers=0, profiler=None, scheduler=None,
+         max_particles=2000, lod=None):
     pygame.init()
     screen = pygame.display.set_mode((800, 600))
     pygame.display.set_caption("Mouse-Controlled Emitter System")
     clock = pygame.time.Clock()
+    input_source = input_source or LiveInput()
+    scheduler = scheduler or FixedStepScheduler(60, lockstep=not fps)
+    profiler = profiler or FrameProfiler()
+    hud = Hud()
+    # Hold the frame rate by simplifying particles; headless runs keep full detail
+    lod = lod or LevelOfDetail(target_ms=1000 / fps if fps else None)
 
     emitters = []
-    particles = []
-    emitter_types = ["fountain", "explosion", "smoke", "rain", "cloud"]
+    # Every spawn is granted by the budget below, so the pool never needs
+    # room for more than its maximum
+    if workers:
+        # Particle updates are sharded over worker processes once there are
+        # enough particles to pay for it; see ParallelUpdater
+        particles = SharedParticleBuffer(capacity=max_particles, rng=rng)
+        updater = ParallelUpdater(particles, workers)
+    else:
+        particles = ParticleBuffer(capacity=max_particles, rng=rng)
+        updater = particles
+    # Random parameters of new particles come in batches from a NumPy generator
+    np_rng = particles.np_rng
+    emitter_owners = OwnerRegistry()
+    # Emitters and clouds share one particle budget, so stacking them
+    # thins out the effects instead of the frame rate
+    budget = ParticleBudget(particles, max_particles, SPAWN_PRIORITIES)
+    emitter_types = EMITTER_TYPES.names
     current_emitter_type = 0
     ground_y = 550  # Ground line 50 pixels from bottom
 
     # Generate fixed ground rectangles with random widths and heights
-    ground_rects = []
-    x = 0
-    while x < 800:
-        width = random.randint(4, 16)
-        height = random.randint(3, 12)
-        ground_rects.append({'x': x + width // 2, 'width': width, 'height': height, 'wetness': 0})
-        x += width
+    ground = Ground(ground_y, 800, rng)
 
+    frame = 0
     running = True
     while running:
-        for event in pygame.event.get():
+        for event in input_source.events():
+            profiler.handle_event(event)
             if event.type == pygame.QUIT:
                 running = False
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:
-                    mouse_x, mouse_y = pygame.mouse.get_pos()
+                    mouse_x, mouse_y = input_source.mouse_pos()
 
                     if emitter_types[current_emitter_type] == "cloud":
                         # Create multiple cloud particles around mouse position
-                        for _ in range(random.randint(8, 15)):
-                            offset_x = random.uniform(-50, 50)
-                            offset_y = random.uniform(-30, 30)
-                            cloud_particle = Particle(
-                                mouse_x + offset_x, mouse_y + offset_y,
-                                random.uniform(-0.3, 0.3), random.uniform(-0.2, 0.2),
-                                random.randint(15, 30), random.randint(15, 30),
-                                (220, 220, 230), random.randint(300, 600),
-                                0, "cloud"
-                            )
-                            particles.append(cloud_particle)
+                        cloud = CLICK_CLOUD.draw(np_rng, budget.grant("cloud", rng.randint(8, 15)))
+                        particles.add_many(
+                            mouse_x + cloud['offset_x'], mouse_y + cloud['offset_y'],
+                            cloud['vx'], cloud['vy'], cloud['width'], cloud['height'],
+                            (220, 220, 230), budget.ttl(cloud['ttl']),
+                            0, "cloud"
+                        )
+                        budget.commit()
                     else:
                         new_emitter = Emitter(
                             mouse_x, mouse_y,
-                            random.randint(20, 40),
-                            random.randint(3, 6),
+                            rng.randint(20, 40),
+                            rng.randint(3, 6),
                             emitter_types[current_emitter_type],
-                            random.randint(300, 600)
+                            rng.randint(300, 600)
                         )
+                        new_emitter.handle = emitter_owners.register(new_emitter)
                         emitters.append(new_emitter)
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE:
                     current_emitter_type = (current_emitter_type + 1) % len(emitter_types)
 
-        screen.fill((20, 20, 40))
-
-        for emitter in emitters:
-            emitter.update()
-            new_particle = emitter.emit_particle()
-            if new_particle:
-                particles.append(new_particle)
-
-        emitters = [e for e in emitters if not e.is_dead()]
-
-        dead_particles = [p for p in particles if p.is_dead()]
-        for emitter in emitters:
-            for dead_particle in dead_particles:
-                emitter.particle_died()
-
-        particles = [p for p in particles if not p.is_dead()]
-
-        # Draw gravelly ground with small rectangles (fixed widths and heights)
-        for rect in ground_rects:
-            # Calculate color based on wetness - more blue when wet
-            base_gray = 80
-            blue_amount = int(rect['wetness'] * 1.5)  # Scale wetness to blue
-            color = (max(0, base_gray - blue_amount // 2), max(0, base_gray - blue_amount // 2), min(255, base_gray + blue_amount))
-            rechthoek(screen, rect['x'], ground_y - rect['height'] // 2, rect['width'], rect['height'], color)
-
-            # Slowly dry the ground over time
-            rect['wetness'] = max(0, rect['wetness'] - 0.2)
-
-        for particle in particles:
-            new_rain = particle.update(ground_y, ground_rects)
-            if new_rain:
-                particles.extend(new_rain)
-            particle.draw(screen)
-
-
-        font = pygame.font.Font(None, 24)
-        total_particles = len(particles)
-        text = font.render(f"Particles: {total_particles}", True, (255, 255, 255))
-        screen.blit(text, (10, 10))
-
-        text = font.render(f"Emitters: {len(emitters)}", True, (255, 255, 255))
-        screen.blit(text, (10, 35))
-
-        text = font.render(f"Current type: {emitter_types[current_emitter_type]}", True, (255, 255, 255))
-        screen.blit(text, (10, 60))
-
-        text = font.render("Click to place emitter, SPACE to change type", True, (255, 255, 255))
-        screen.blit(text, (10, 85))
-
-        pygame.display.flip()
-        clock.tick(60)
-
+        # Simulate in fixed ticks, however fast frames are drawn
+        for _ in range(scheduler.advance()):
+            with profiler.phase("emit"):
+                for emitter in emitters:
+                    emitter.update()
+                emit_particles(emitters, particles, np_rng, budget)
+
+                for emitter in emitters:
+                    if emitter.is_dead():
+                        emitter_owners.unregister(emitter.handle)
+                emitters = [e for e in emitters if not e.is_dead()]
+
+                for emitter, died in emitter_owners.deaths(particles.remove_dead()):
+                    emitter.particle_died(died)
+
+            with profiler.phase("ground"):
+                ground.dry()
+
+            with profiler.phase("update"):
+                updater.update(ground_y, ground)
+                drop_cloud_rain(particles, np_rng, budget)
+
+        if scheduler.render:
+            with profiler.phase("draw"):
+                screen.fill((20, 20, 40))
+
+            # Draw gravelly ground with small rectangles (fixed widths and heights)
+            with profiler.phase("ground"):
+                ground.draw(screen)
+
+            with profiler.phase("draw"):
+                particles.draw(screen, cache=sprite_cache, interpolation=scheduler.alpha, lod=lod)
+
+            with profiler.phase("ui"):
+                total_particles = len(particles)
+                lines = [
+                    (f"Particles: {total_particles}", (10, 10), (255, 255, 255)),
+                    (f"Emitters: {len(emitters)}", (10, 35), (255, 255, 255)),
+                    (f"Current type: {emitter_types[current_emitter_type]}", (10, 60), (255, 255, 255)),
+                    ("Click to place emitter, SPACE to change type", (10, 85), (255, 255, 255)),
+                ]
+
+                if sprite_cache is not None:
+                    stats = sprite_cache.stats()
+                    lines.append((f"Sprite cache: {stats['sprites']} sprites, {stats['hits']} hits, "
+                                  f"{stats['misses']} misses, {stats['evictions']} evictions", (10, 110), (255, 255, 255)))
+
+                stats = budget.stats()
+                if stats['dropped'] or stats['shortened']:
+                    lines.append((f"Budget: {stats['live']}/{stats['max']} particles, {sum(stats['dropped'].values())} "
+                                  f"spawns dropped, {stats['shortened']} lives shortened", (10, 160), (255, 255, 255)))
+
+                if lod.level:
+                    stats = lod.stats()
+                    lines.append((f"Detail level {stats['level']}: {stats['pixels']} pixels, {stats['rects']} plain rects, "
+                                  f"{stats['culled']} off-screen", (10, 135), (255, 255, 255)))
+
+                hud.draw(screen, lines)
+
+                profiler.draw(screen)
+
+            if on_frame:
+                on_frame(screen, len(particles))
+
+            with profiler.phase("flip"):
+                pygame.display.flip()
+
+        clock.tick(fps)
+        lod.adapt(clock.get_rawtime())
+        profiler.end_frame()
+        frame += 1
+        if frame == frames:
+            running = False
+
+    profiler.close()
+    if workers:
+        updater.close()
     pygame.quit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(sprite_cache=SpriteCache() if "--sprite-cache" in sys.argv else None,
+         workers=int(sys.argv[sys.argv.index("--workers") + 1]) if "--workers" in sys.argv else 0,
+         profiler=FrameProfiler(csv_path=sys.argv[sys.argv.index("--profile-csv") + 1])
+         if "--profile-csv" in sys.argv else None,
+         max_particles=int(sys.argv[sys.argv.index("--max-particles") + 1]) if "--max-particles" in sys.argv else 2000)
\ No newline at end of file
@@ -1,76 +1,111 @@
 import pygame
 import math
+import random
+import sys
 
-def rechthoek(surface, x=100, y=100, width=80, height=40, color=(255, 255, 255), rotation=0):
-    """Draw a rectangle with position, color, and rotation.
-
-    Args:
-        surface: pygame surface to draw on
-        x, y: center position of rectangle
-        width, height: rectangle dimensions
-        color: RGB color tuple
-        rotation: rotation angle in degrees
-    """
-    if rotation == 0:
-        rect = pygame.Rect(x - width//2, y - height//2, width, height)
-        pygame.draw.rect(surface, color, rect)
-    else:
-        points = []
-        half_w, half_h = width // 2, height // 2
-        corners = [(-half_w, -half_h), (half_w, -half_h), (half_w, half_h), (-half_w, half_h)]
-
-        rad = math.radians(rotation)
-        cos_r, sin_r = math.cos(rad), math.sin(rad)
-
-        for cx, cy in corners:
-            rotated_x = cx * cos_r - cy * sin_r + x
-            rotated_y = cx * sin_r + cy * cos_r + y
-            points.append((rotated_x, rotated_y))
-
-        pygame.draw.polygon(surface, color, points)
-
-def main():
+import numpy as np
+
+from animation import Animation, linear_wrap, orbit, oscillate, spin
+from dirty_rects import DirtyRenderer, rect_bounds
+from rechthoek_batch import rechthoek_batch
+from runtime import FixedStepScheduler, LiveInput
+from scene import Layer, RectNode, Scene
+
+def main(frames=None, rng=random, input_source=None, fps=60, on_frame=None, extra_rects=0):
     pygame.init()
     screen = pygame.display.set_mode((800, 600))
     pygame.display.set_caption("Moving Rectangle Examples")
     clock = pygame.time.Clock()
-
-    time = 0
+    input_source = input_source or LiveInput()
+    renderer = DirtyRenderer(screen, (0, 0, 0))
+    scheduler = FixedStepScheduler(60, lockstep=not fps)
+
+    # Retained rectangles; each frame only their transforms are updated
+    horizontal = RectNode(y=100, color=(255, 0, 0))
+    circle = RectNode(color=(0, 255, 0))
+    vertical = RectNode(x=600, width=60, height=100, color=(0, 0, 255))
+    diagonal = RectNode(width=40, height=80, color=(255, 255, 0))
+    spinner = RectNode(x=400, y=500, width=100, height=30, color=(255, 0, 255))
+    nodes = [horizontal, circle, vertical, diagonal, spinner]
+    scene = Scene([Layer(nodes)])
+
+    # Their motions, evaluated for all five at once
+    animation = Animation()
+    # Moving horizontally
+    animation.add(oscillate("x", 200, 0.02), x=100, y=100)
+    # Moving in circle
+    animation.add(orbit(150, 0.03), spin(2), x=400, y=300)
+    # Moving vertically with rotation
+    animation.add(oscillate("y", 180, 0.025), spin(1.5), x=600, y=100)
+    # Moving diagonally
+    animation.add(linear_wrap("x", 0.5, 700), oscillate("y", 100, 0.04), spin(3), x=50, y=400)
+    # Rotating in place
+    animation.add(spin(4), x=400, y=500)
+
+    # Optional crowd of extra rectangles to stress the animation engine,
+    # using a sine lookup table
+    crowd = Animation(lut_size=4096)
+    if extra_rects:
+        np_rng = np.random.default_rng(rng.getrandbits(64))
+        crowd_width = np_rng.integers(4, 12, extra_rects, endpoint=True)
+        crowd_height = np_rng.integers(4, 12, extra_rects, endpoint=True)
+        crowd_color = np_rng.integers(60, 255, (extra_rects, 3), endpoint=True)
+        for kind in np_rng.integers(3, size=extra_rects).tolist():
+            if kind == 0:
+                # Circling a random point
+                path = [orbit(np_rng.uniform(20, 200), np_rng.uniform(-0.05, 0.05), np_rng.uniform(0, 2 * math.pi))]
+            elif kind == 1:
+                # Drifting to the right while bobbing
+                path = [linear_wrap("x", np_rng.uniform(0.2, 3), 800, np_rng.uniform(0, 800)),
+                        oscillate("y", np_rng.uniform(5, 60), np_rng.uniform(0.01, 0.1))]
+            else:
+                # Lissajous figure around a random point
+                path = [oscillate("x", np_rng.uniform(50, 300), np_rng.uniform(0.01, 0.05)),
+                        oscillate("y", np_rng.uniform(50, 250), np_rng.uniform(0.01, 0.05), wave="cos")]
+            crowd.add(*path, spin(np_rng.uniform(-4, 4)),
+                      x=0 if kind == 1 else np_rng.uniform(0, 800), y=np_rng.uniform(0, 600))
+
+    frame = 0
+    previous_time = time = 0
     running = True
 
     while running:
-        for event in pygame.event.get():
+        for event in input_source.events():
+            renderer.handle_event(event)
             if event.type == pygame.QUIT:
                 running = False
 
-        screen.fill((0, 0, 0))
+        # Animation time advances in fixed ticks
+        for _ in range(scheduler.advance()):
+            previous_time = time
+            time += 1
 
-        # Moving horizontally
-        x1 = 100 + math.sin(time * 0.02) * 200
-        rechthoek(screen, x=x1, y=100, color=(255, 0, 0))
+        if scheduler.render:
+            # Draw in between the last two ticks
+            t = previous_time + (time - previous_time) * scheduler.alpha
+            renderer.clear()
 
-        # Moving in circle
-        x2 = 400 + math.cos(time * 0.03) * 150
-        y2 = 300 + math.sin(time * 0.03) * 150
-        rechthoek(screen, x=x2, y=y2, color=(0, 255, 0), rotation=time * 2)
+            if len(crowd):
+                crowd_x, crowd_y, crowd_rotation = crowd.evaluate(t)
+                rechthoek_batch(screen, crowd_x, crowd_y, crowd_width, crowd_height, crowd_color, crowd_rotation)
+                renderer.mark_all(rect_bounds(crowd_x, crowd_y, crowd_width, crowd_height, crowd_rotation))
 
-        # Moving vertically with rotation
-        y3 = 100 + math.sin(time * 0.025) * 180
-        rechthoek(screen, x=600, y=y3, width=60, height=100, color=(0, 0, 255), rotation=time * 1.5)
+            x, y, rotation = animation.evaluate(t)
+            for node, node_x, node_y, node_rotation in zip(nodes, x.tolist(), y.tolist(), rotation.tolist()):
+                node.set(x=node_x, y=node_y, rotation=node_rotation)
+            renderer.mark_all(scene.draw(screen))
 
-        # Moving diagonally
-        x4 = 50 + (time * 0.5) % 700
-        y4 = 400 + math.sin(time * 0.04) * 100
-        rechthoek(screen, x=x4, y=y4, width=40, height=80, color=(255, 255, 0), rotation=time * 3)
+            if on_frame:
+                on_frame(screen, len(nodes) + len(crowd))
 
-        # Rotating in place
-        rechthoek(screen, x=400, y=500, width=100, height=30, color=(255, 0, 255), rotation=time * 4)
+            renderer.present()
 
-        pygame.display.flip()
-        clock.tick(60)
-        time += 1
+        clock.tick(fps)
+        frame += 1
+        if frame == frames:
+            running = False
 
     pygame.quit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(extra_rects=int(sys.argv[sys.argv.index("--rects") + 1]) if "--rects" in sys.argv else 0)
\ No newline at end of file
@@ -0,0 +1,116 @@
+"""Particle updates spread over worker processes.
+
+The arrays of a SharedParticleBuffer live in a single
+multiprocessing.shared_memory block. Every worker process maps the same
+block and updates its own shard of the live particles. The main process
+waits for all shards to finish (the frame barrier) and only then spawns,
+removes dead particles and wets the ground, so those never race with the
+workers.
+"""
+import multiprocessing
+import os
+import random
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from particle_buffer import ParticleBuffer
+
+
+def _aligned(nbytes):
+    # Keep every field array on an 8 byte boundary
+    return -(-nbytes // 8) * 8
+
+
+class SharedParticleBuffer(ParticleBuffer):
+    """ParticleBuffer whose arrays live in shared memory.
+
+    Args:
+        capacity: maximum number of live particles
+        rng: random number generator used when adding particles
+        name: name of an existing block to attach to; a new block is
+            created when None
+    """
+
+    def __init__(self, capacity=16384, rng=random, name=None):
+        size = sum(_aligned(int(np.prod(shape)) * dtype.itemsize) for _, shape, dtype in self.layout(capacity))
+        self.owns_memory = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owns_memory, size=size)
+        self.offset = 0
+        super().__init__(capacity, rng)
+
+    def allocate(self, shape, dtype):
+        array = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=self.offset)
+        if self.owns_memory:
+            array.fill(0)
+        self.offset += _aligned(array.nbytes)
+        return array
+
+    def close(self):
+        """Release the shared memory; the block is freed by its creator."""
+        # The views must be gone before the mapping can be closed
+        for name, _ in self.FIELDS:
+            setattr(self, name, None)
+        self.shm.close()
+        if self.owns_memory:
+            self.shm.unlink()
+
+
+# Each worker process attaches to the shared particles once
+_worker_particles = None
+
+
+def _attach(name, capacity):
+    global _worker_particles
+    _worker_particles = SharedParticleBuffer(capacity, name=name)
+
+
+def _update_shard(shard):
+    start, stop, ground_y = shard
+    return _worker_particles.update_range(start, stop, ground_y)
+
+
+class ParallelUpdater:
+    """Updates a SharedParticleBuffer with a pool of worker processes.
+
+    Handing out the shards and waiting at the barrier costs about a
+    millisecond per update, while one process updates a particle in about
+    12 ns. Two workers only win that back from some 130,000 particles, so
+    populations too small to give every shard ``min_shard`` particles are
+    updated in this process, so a pool of workers costs nothing but idle
+    processes until the population gets that large.
+
+    Args:
+        particles: the SharedParticleBuffer to update
+        workers: number of worker processes, all cores when None
+        min_shard: smallest number of particles worth giving to a worker
+    """
+
+    def __init__(self, particles, workers=None, min_shard=65536):
+        self.particles = particles
+        self.workers = workers or os.cpu_count() or 1
+        self.min_shard = min_shard
+        self.pool = multiprocessing.Pool(self.workers, _attach, (particles.shm.name, particles.capacity))
+        self.parallel_updates = 0
+
+    def update(self, ground_y=None, ground=None):
+        """Same as ParticleBuffer.update(), split over the workers."""
+        n = len(self.particles)
+        shards = min(self.workers, n // self.min_shard)
+        if shards < 2:
+            return self.particles.update(ground_y, ground)
+
+        bounds = np.linspace(0, n, shards + 1).astype(int).tolist()
+        landed = np.concatenate(self.pool.map(
+            _update_shard, [(start, stop, ground_y) for start, stop in zip(bounds, bounds[1:])]))
+        self.parallel_updates += 1
+
+        # Make ground blocks wetter where rain hits
+        if ground is not None and landed.size:
+            ground.wet(self.particles.x[landed])
+        return landed
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+        self.particles.close()
@@ -0,0 +1,287 @@
+import random
+
+import numpy as np
+
+from dirty_rects import rect_bounds
+from rechthoek_batch import rechthoek_batch
+from spawn_ranges import SpawnRanges
+
+PARTICLE_TYPES = ("normal", "rain", "cloud", "fire", "fog")
+TYPE_CODES = {name: code for code, name in enumerate(PARTICLE_TYPES)}
+
+# Spin and rain delay of new particles
+SPIN = SpawnRanges(rotation=(0.0, 360.0), rotation_speed=(-3.0, 3.0), rain_timer=(0, 60))
+
+
+class ParticleBuffer:
+    """Fixed-capacity structure-of-arrays pool for short-lived particles.
+
+    Every particle property lives in its own contiguous NumPy array, so a
+    frame of particles is integrated, aged and bounced with a handful of
+    vectorized steps instead of one Python method call per particle.
+    Only the first ``len(buffer)`` entries of each array are live.
+
+    The arrays are allocated once. Dead particles are removed by moving
+    live ones from the end into their slots, and new particles reuse the
+    freed slots. When the pool is full, new particles are dropped.
+
+    ``add_many()`` spawns a whole batch at once and draws the random spin
+    and rain delay of the batch from ``np_rng``, a NumPy Generator seeded
+    from ``rng``, so a seeded run always spawns the same particles.
+    """
+
+    FIELDS = (
+        ("x", np.float64), ("y", np.float64),
+        ("vx", np.float64), ("vy", np.float64),
+        ("rotation", np.float64), ("rotation_speed", np.float64),
+        ("ttl", np.int32), ("max_ttl", np.int32),
+        ("gravity", np.float64),
+        ("width", np.int32), ("height", np.int32),
+        ("color", (np.uint8, 3)),
+        ("type", np.int8),
+        ("rain_timer", np.int32),
+        ("owner", np.int32),
+        # State before the last update, for drawing in between updates
+        ("prev_x", np.float64), ("prev_y", np.float64), ("prev_rotation", np.float64),
+    )
+
+    def __init__(self, capacity=16384, rng=random):
+        self.np_rng = np.random.default_rng(rng.getrandbits(64))
+        self.capacity = capacity
+        self.count = 0
+        self.high_water = 0
+        self.spawned = 0
+        self.reused = 0
+        self.dropped = 0
+        for name, shape, dtype in self.layout(capacity):
+            setattr(self, name, self.allocate(shape, dtype))
+
+    def __len__(self):
+        return self.count
+
+    @classmethod
+    def layout(cls, capacity):
+        """Yield ``(name, shape, dtype)`` of every field array."""
+        for name, dtype in cls.FIELDS:
+            if isinstance(dtype, tuple):
+                dtype, width = dtype
+                yield name, (capacity, width), np.dtype(dtype)
+            else:
+                yield name, (capacity,), np.dtype(dtype)
+
+    def allocate(self, shape, dtype):
+        return np.zeros(shape, dtype=dtype)
+
+    def add(self, x, y, vx, vy, width, height, color, ttl, gravity=0, particle_type="normal", owner=-1):
+        """Add one particle in the next free slot and return its index.
+
+        A batch of one for add_many(), so its spin and rain delay come from
+        ``np_rng`` as well. ``owner`` is a handle from an OwnerRegistry, or
+        -1 for none. Returns -1 without adding anything when the pool is
+        full.
+        """
+        added = self.add_many([x], y, vx, vy, width, height, color, ttl, gravity, particle_type, owner)
+        return int(added[0]) if len(added) else -1
+
+    def add_many(self, x, y, vx, vy, width, height, color, ttl, gravity=0, particle_type="normal", owner=-1):
+        """Add a batch of particles, one per entry of ``x``.
+
+        The other arguments may be sequences of the same length or single
+        values shared by the whole batch; ``particle_type`` is a name or
+        an array of type codes (see TYPE_CODES). Particles that do not fit
+        in the pool are dropped from the end of the batch. Returns the
+        slot indices of the particles added, in batch order.
+        """
+        requested = len(x)
+        start = self.count
+        stop = min(self.capacity, start + requested)
+        added = stop - start
+        self.dropped += requested - added
+        if not added:
+            return np.arange(start, start)
+
+        self.reused += max(0, min(stop, self.high_water) - start)
+        self.high_water = max(self.high_water, stop)
+        self.spawned += added
+        batch = slice(start, stop)
+        for name, values in (("x", x), ("y", y), ("vx", vx), ("vy", vy), ("width", width), ("height", height),
+                             ("ttl", ttl), ("max_ttl", ttl), ("gravity", gravity), ("owner", owner),
+                             ("color", color)):
+            if added < requested and np.ndim(values) > (name == "color"):
+                values = values[:added]
+            getattr(self, name)[batch] = values
+        if isinstance(particle_type, str):
+            self.type[batch] = TYPE_CODES[particle_type]
+        else:
+            self.type[batch] = particle_type[:added]
+
+        spin = SPIN.draw(self.np_rng, added)
+        self.rotation[batch] = spin['rotation']
+        self.rotation_speed[batch] = spin['rotation_speed']
+        self.rain_timer[batch] = spin['rain_timer']  # Random delay before dropping rain
+        self.prev_x[batch] = self.x[batch]
+        self.prev_y[batch] = self.y[batch]
+        self.prev_rotation[batch] = self.rotation[batch]
+        self.count = stop
+        return np.arange(start, stop)
+
+    def of_type(self, particle_type):
+        """Boolean mask over the live particles of the given type."""
+        return self.type[:self.count] == TYPE_CODES[particle_type]
+
+    def update(self, ground_y=None, ground=None):
+        """Advance every live particle by one frame.
+
+        Returns the indices of particles that hit the ground this frame.
+        """
+        landed = self.update_range(0, self.count, ground_y)
+
+        # Make ground blocks wetter where rain hits
+        if ground is not None and landed.size:
+            ground.wet(self.x[landed])
+        return landed
+
+    def update_range(self, start, stop, ground_y=None):
+        """Advance the particles in slots ``start`` to ``stop`` by one frame.
+
+        Touches nothing outside that range, so disjoint ranges can be
+        updated at the same time. Returns the indices of particles in the
+        range that hit the ground.
+        """
+        x, y = self.x[start:stop], self.y[start:stop]
+        vx, vy = self.vx[start:stop], self.vy[start:stop]
+        gravity = self.gravity[start:stop]
+        ttl = self.ttl[start:stop]
+
+        self.prev_x[start:stop] = x
+        self.prev_y[start:stop] = y
+        self.prev_rotation[start:stop] = self.rotation[start:stop]
+
+        x += vx
+        y += vy
+        vy += gravity
+        self.rotation[start:stop] += self.rotation_speed[start:stop]
+        ttl -= 1
+
+        if not ground_y:
+            return np.empty(0, dtype=np.intp)
+
+        # Falling particles bounce off the ground and die soon after
+        landed = np.flatnonzero((gravity > 0) & (y >= ground_y))
+        if landed.size:
+            y[landed] = ground_y
+            vy[landed] = -np.abs(vy[landed]) * 0.3  # Bounce up with reduced velocity
+            vx[landed] *= 0.8  # Reduce horizontal velocity
+            ttl[landed] = np.minimum(ttl[landed], 30)  # Force death soon after bouncing
+        return start + landed
+
+    def darken(self):
+        """Scale every color by remaining life, fading particles to black."""
+        n = self.count
+        life = np.maximum(0, self.ttl[:n] / self.max_ttl[:n])
+        self.color[:n] = (self.color[:n] * life[:, None]).astype(np.uint8)
+
+    def get_alpha(self):
+        return np.maximum(0, (255 * (self.ttl[:self.count] / self.max_ttl[:self.count])).astype(np.int32))
+
+    def is_dead(self):
+        return self.ttl[:self.count] <= 0
+
+    def remove_dead(self):
+        """Compact the live particles to the front of the arrays, in place.
+
+        Live particles beyond the new end are moved into the slots of dead
+        ones. Finding the dead takes a few vectorized passes over every
+        live particle, but nothing is allocated per field and only the
+        particles that move are copied. Returns the owner handles of the
+        removed particles, one per particle.
+        """
+        n = self.count
+        alive = self.ttl[:n] > 0
+        kept = int(np.count_nonzero(alive))
+        if kept == n:
+            return np.empty(0, dtype=np.int32)
+
+        dead_owners = self.owner[:n][~alive]
+        holes = np.flatnonzero(~alive[:kept])
+        movers = kept + np.flatnonzero(alive[kept:])
+        if holes.size:
+            for name, _ in self.FIELDS:
+                values = getattr(self, name)
+                values[holes] = values[movers]
+        self.count = kept
+        return dead_owners
+
+    def stats(self):
+        return {
+            'live': self.count,
+            'capacity': self.capacity,
+            'high_water': self.high_water,
+            'spawned': self.spawned,
+            'reused': self.reused,
+            'dropped': self.dropped,
+        }
+
+    def draw(self, surface, alpha=True, cache=None, interpolation=1.0, lod=None):
+        """Draw every live particle with a single rechthoek_batch() call.
+
+        ``interpolation`` places the particles between their state before
+        (0.0) and after (1.0) the last update. With a LevelOfDetail as
+        ``lod``, off-screen particles are skipped and small or faint ones
+        drawn simplified.
+        """
+        n = self.count
+        x, y, rotation = self.placement(interpolation)
+        if lod is not None:
+            lod.draw(surface, x, y, self.width[:n], self.height[:n],
+                     self.color[:n], rotation, self.get_alpha() if alpha else None, cache)
+            return
+        rechthoek_batch(surface, x, y, self.width[:n], self.height[:n],
+                        self.color[:n], rotation, self.get_alpha() if alpha else None, cache)
+
+    def placement(self, interpolation=1.0):
+        """Drawn x, y and rotation of the live particles."""
+        n = self.count
+        x, y, rotation = self.x[:n], self.y[:n], self.rotation[:n]
+        if interpolation != 1.0:
+            x = self.prev_x[:n] + (x - self.prev_x[:n]) * interpolation
+            y = self.prev_y[:n] + (y - self.prev_y[:n]) * interpolation
+            rotation = self.prev_rotation[:n] + (rotation - self.prev_rotation[:n]) * interpolation
+        return x, y, rotation
+
+    def bounds(self, interpolation=1.0):
+        """Screen bounding boxes of the particles as draw() places them."""
+        x, y, rotation = self.placement(interpolation)
+        return rect_bounds(x, y, self.width[:self.count], self.height[:self.count], rotation)
+
+
+class OwnerRegistry:
+    """Hands out owner handles for particles and routes deaths back to owners.
+
+    Handles are never reused, so deaths of particles whose owner has been
+    unregistered are simply dropped.
+    """
+
+    def __init__(self):
+        self.owners = {}
+        self.next_handle = 0
+
+    def register(self, owner):
+        handle = self.next_handle
+        self.next_handle += 1
+        self.owners[handle] = owner
+        return handle
+
+    def unregister(self, handle):
+        self.owners.pop(handle, None)
+
+    def clear(self):
+        self.owners.clear()
+
+    def deaths(self, dead_owners):
+        """Yield ``(owner, count)`` for every registered owner that lost particles."""
+        handles, counts = np.unique(dead_owners[dead_owners >= 0], return_counts=True)
+        for handle, count in zip(handles.tolist(), counts.tolist()):
+            owner = self.owners.get(handle)
+            if owner is not None:
+                yield owner, count
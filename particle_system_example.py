@@ -1,91 +1,84 @@
 import pygame
-import math
 import random
 
-def rechthoek(surface, x=100, y=100, width=80, height=40, color=(255, 255, 255), rotation=0):
-    """Draw a rectangle with position, color, and rotation.
-
-    Args:
-        surface: pygame surface to draw on
-        x, y: center position of rectangle
-        width, height: rectangle dimensions
-        color: RGB color tuple
-        rotation: rotation angle in degrees
-    """
-    if rotation == 0:
-        rect = pygame.Rect(x - width//2, y - height//2, width, height)
-        pygame.draw.rect(surface, color, rect)
-    else:
-        points = []
-        half_w, half_h = width // 2, height // 2
-        corners = [(-half_w, -half_h), (half_w, -half_h), (half_w, half_h), (-half_w, half_h)]
-
-        rad = math.radians(rotation)
-        cos_r, sin_r = math.cos(rad), math.sin(rad)
-
-        for cx, cy in corners:
-            rotated_x = cx * cos_r - cy * sin_r + x
-            rotated_y = cx * sin_r + cy * cos_r + y
-            points.append((rotated_x, rotated_y))
-
-        pygame.draw.polygon(surface, color, points)
-
-class Particle:
-    def __init__(self, screen_width, screen_height):
-        self.x = random.uniform(0, screen_width)
-        self.y = random.uniform(0, screen_height)
-        self.vx = random.uniform(-2, 2)
-        self.vy = random.uniform(-2, 2)
-        self.width = random.randint(8, 20)
-        self.height = random.randint(8, 20)
-        self.rotation = random.uniform(0, 360)
-        self.rotation_speed = random.uniform(-5, 5)
-        self.color = (
-            random.randint(100, 255),
-            random.randint(100, 255),
-            random.randint(100, 255)
-        )
+import numpy as np
+
+from dirty_rects import DirtyRenderer, rect_bounds
+from rechthoek_batch import rechthoek_batch
+from runtime import FixedStepScheduler, LiveInput
+
+class Particles:
+    def __init__(self, count, screen_width, screen_height, rng=None):
+        rng = rng or np.random.default_rng()
+        self.x = rng.uniform(0, screen_width, count)
+        self.y = rng.uniform(0, screen_height, count)
+        self.vx = rng.uniform(-2, 2, count)
+        self.vy = rng.uniform(-2, 2, count)
+        self.width = rng.integers(8, 20, count, endpoint=True)
+        self.height = rng.integers(8, 20, count, endpoint=True)
+        self.rotation = rng.uniform(0, 360, count)
+        self.rotation_speed = rng.uniform(-5, 5, count)
+        self.color = rng.integers(100, 255, (count, 3), endpoint=True)
+        self.previous = (self.x.copy(), self.y.copy(), self.rotation.copy())
         self.screen_width = screen_width
         self.screen_height = screen_height
 
     def update(self):
+        self.previous = (self.x.copy(), self.y.copy(), self.rotation.copy())
         self.x += self.vx
         self.y += self.vy
         self.rotation += self.rotation_speed
 
-        if self.x < 0 or self.x > self.screen_width:
-            self.vx *= -1
-        if self.y < 0 or self.y > self.screen_height:
-            self.vy *= -1
+        self.vx[(self.x < 0) | (self.x > self.screen_width)] *= -1
+        self.vy[(self.y < 0) | (self.y > self.screen_height)] *= -1
 
-        self.x = max(0, min(self.screen_width, self.x))
-        self.y = max(0, min(self.screen_height, self.y))
+        np.clip(self.x, 0, self.screen_width, out=self.x)
+        np.clip(self.y, 0, self.screen_height, out=self.y)
 
-    def draw(self, surface):
-        rechthoek(surface, self.x, self.y, self.width, self.height, self.color, self.rotation)
+    def draw(self, surface, interpolation=1.0):
+        # Draw in between the previous and the current update
+        prev_x, prev_y, prev_rotation = self.previous
+        x = prev_x + (self.x - prev_x) * interpolation
+        y = prev_y + (self.y - prev_y) * interpolation
+        rotation = prev_rotation + (self.rotation - prev_rotation) * interpolation
+        rechthoek_batch(surface, x, y, self.width, self.height, self.color, rotation)
+        return rect_bounds(x, y, self.width, self.height, rotation)
 
-def main():
+def main(frames=None, rng=random, input_source=None, fps=60, on_frame=None):
     pygame.init()
     screen = pygame.display.set_mode((800, 600))
     pygame.display.set_caption("Particle System with 100 Rectangles")
     clock = pygame.time.Clock()
+    input_source = input_source or LiveInput()
+    renderer = DirtyRenderer(screen, (20, 20, 30))
+    scheduler = FixedStepScheduler(60, lockstep=not fps)
 
-    particles = [Particle(800, 600) for _ in range(100)]
+    particles = Particles(100, 800, 600, np.random.default_rng(rng.getrandbits(64)))
 
+    frame = 0
     running = True
     while running:
-        for event in pygame.event.get():
+        for event in input_source.events():
+            renderer.handle_event(event)
             if event.type == pygame.QUIT:
                 running = False
 
-        screen.fill((20, 20, 30))
+        for _ in range(scheduler.advance()):
+            particles.update()
 
-        for particle in particles:
-            particle.update()
-            particle.draw(screen)
+        if scheduler.render:
+            renderer.clear()
+            renderer.mark_all(particles.draw(screen, scheduler.alpha))
 
-        pygame.display.flip()
-        clock.tick(60)
+            if on_frame:
+                on_frame(screen, len(particles.x))
+
+            renderer.present()
+
+        clock.tick(fps)
+        frame += 1
+        if frame == frames:
+            running = False
 
     pygame.quit()
 
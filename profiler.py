@@ -0,0 +1,104 @@
+import csv
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pygame
+
+
+class FrameProfiler:
+    """Times the phases of every frame, such as emit, update and draw.
+
+    Wrap each phase of the main loop in ``with profiler.phase(name):`` and
+    call ``end_frame()`` once per frame. A phase that runs several times in
+    one frame, like a simulation tick, is summed. The last ``window`` frames
+    are kept for the overlay, which F3 toggles, and every frame can be
+    streamed to a CSV file with one ``frame,phase,ms`` row per phase.
+
+    Args:
+        window: number of frames the rolling averages cover
+        csv_path: file to write per-frame timings to, or None
+        toggle_key: key that shows and hides the overlay
+    """
+
+    def __init__(self, window=120, csv_path=None, toggle_key=pygame.K_F3):
+        self.window = window
+        self.toggle_key = toggle_key
+        self.visible = False
+        self.timings = {}
+        self.current = {}
+        self.frame = 0
+        self.frame_start = time.perf_counter()
+        self.font = None
+
+        self.csv_file = open(csv_path, "w", newline="") if csv_path else None
+        if self.csv_file:
+            self.csv = csv.writer(self.csv_file)
+            self.csv.writerow(["frame", "phase", "ms"])
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.current[name] = self.current.get(name, 0.0) + time.perf_counter() - start
+
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN and event.key == self.toggle_key:
+            self.visible = not self.visible
+
+    def end_frame(self):
+        """Close the current frame and store its timings."""
+        now = time.perf_counter()
+        self.current["frame"] = now - self.frame_start
+        self.frame_start = now
+
+        for name in self.timings.keys() | self.current.keys():
+            if name not in self.timings:
+                self.timings[name] = deque(maxlen=self.window)
+            self.timings[name].append(self.current.get(name, 0.0))
+
+        if self.csv_file:
+            self.csv.writerows([self.frame, name, f"{seconds * 1000:.3f}"]
+                               for name, seconds in self.current.items())
+        self.current = {}
+        self.frame += 1
+
+    def stats(self):
+        """Mean and max milliseconds per phase over the rolling window."""
+        return {name: {'mean': 1000 * sum(values) / len(values), 'max': 1000 * max(values)}
+                for name, values in self.timings.items() if values}
+
+    def draw(self, surface):
+        """Draw the timing overlay in the top right corner when visible.
+
+        Returns the screen area covered, or None when hidden.
+        """
+        if not self.visible:
+            return None
+        if self.font is None:
+            self.font = pygame.font.Font(None, 20)
+
+        stats = self.stats()
+        # Slowest phases first, the whole frame always on top
+        names = sorted(stats, key=lambda name: (name != "frame", -stats[name]['mean']))
+        rows = [("phase", "avg ms", "max ms")]
+        rows += [(name, f"{stats[name]['mean']:.2f}", f"{stats[name]['max']:.2f}") for name in names]
+
+        width, line_height = 220, 18
+        panel = pygame.Surface((width, line_height * len(rows) + 10), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+        for i, row in enumerate(rows):
+            y = 5 + line_height * i
+            panel.blit(self.font.render(row[0], True, (255, 255, 255)), (10, y))
+            # Numbers are right-aligned in their columns
+            for text, right in zip(row[1:], (150, 210)):
+                rendered = self.font.render(text, True, (255, 255, 255))
+                panel.blit(rendered, (right - rendered.get_width(), y))
+        return surface.blit(panel, (surface.get_width() - width - 10, 10))
+
+    def close(self):
+        if self.csv_file:
+            self.csv_file.close()
+            self.csv_file = None
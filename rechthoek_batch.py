@@ -0,0 +1,120 @@
+import numpy as np
+import pygame
+
+from surface_pool import scratch_pool
+
+# Corner directions in the order rechthoek() visits them
+CORNERS_X = np.array([-1, 1, 1, -1])
+CORNERS_Y = np.array([-1, -1, 1, 1])
+
+
+def rechthoek_batch(surface, x, y, width=80, height=40, color=(255, 255, 255), rotation=0, alpha=None, cache=None):
+    """Draw many rectangles with position, color, rotation, and transparency.
+
+    Takes the same arguments as rechthoek(), but every argument may be an
+    array with one entry per rectangle; single values are shared by all of
+    them. The corner geometry of all rectangles is computed in one
+    vectorized pass. Opaque rectangles are drawn straight onto the surface,
+    consecutive transparent ones are blended on with a single batched blit
+    and fully transparent ones are skipped. Drawing order is preserved.
+
+    Args:
+        surface: pygame surface to draw on
+        x, y: center positions of the rectangles
+        width, height: rectangle dimensions
+        color: RGB color tuple, or an (N, 3) array of colors
+        rotation: rotation angles in degrees
+        alpha: transparency (0-255), or None to draw everything opaque
+        cache: optional SpriteCache; rotation and alpha are snapped to its
+            steps and every rectangle is blitted from a cached sprite
+    """
+    x = np.atleast_1d(np.asarray(x, dtype=np.float64))
+    n = len(x)
+    if n == 0:
+        return
+    y = np.broadcast_to(np.asarray(y, dtype=np.float64), (n,))
+    width = np.broadcast_to(np.asarray(width, dtype=np.int64), (n,))
+    height = np.broadcast_to(np.asarray(height, dtype=np.int64), (n,))
+    rotation = np.broadcast_to(np.asarray(rotation, dtype=np.float64), (n,))
+    color = np.broadcast_to(np.asarray(color, dtype=np.int64), (n, 3))
+    if alpha is None:
+        alpha = np.full(n, 255)
+    alpha = np.clip(np.broadcast_to(np.asarray(alpha, dtype=np.int64), (n,)), 0, 255)
+
+    if cache is not None:
+        _blit_cached(surface, cache, x, y, width, height, color, rotation, alpha)
+        return
+
+    # Rotated corner offsets relative to each center, shape (n, 4)
+    half_w = (width // 2)[:, None]
+    half_h = (height // 2)[:, None]
+    rad = np.radians(rotation)[:, None]
+    cos_r, sin_r = np.cos(rad), np.sin(rad)
+    corner_x = CORNERS_X * half_w
+    corner_y = CORNERS_Y * half_h
+    offset_x = corner_x * cos_r - corner_y * sin_r
+    offset_y = corner_x * sin_r + corner_y * cos_r
+
+    straight = (rotation == 0).tolist()
+    visible = np.flatnonzero(alpha > 0)
+    pad_w = width + 10
+    pad_h = height + 10
+
+    # Corners on the target surface for opaque rectangles, and on a padded
+    # surface of their own for transparent ones
+    points = np.where((alpha < 255)[:, None, None],
+                      np.stack([offset_x + (pad_w // 2)[:, None], offset_y + (pad_h // 2)[:, None]], axis=2),
+                      np.stack([offset_x + x[:, None], offset_y + y[:, None]], axis=2))
+    points = points[visible].tolist()
+    rect_x = np.where(alpha < 255, 5, x - width // 2).astype(np.int64)[visible].tolist()
+    rect_y = np.where(alpha < 255, 5, y - height // 2).astype(np.int64)[visible].tolist()
+    dest_x = (x - pad_w // 2)[visible].tolist()
+    dest_y = (y - pad_h // 2)[visible].tolist()
+    rgba = np.column_stack([color, alpha])[visible].tolist()
+    sizes = np.column_stack([width, height, pad_w, pad_h])[visible].tolist()
+
+    draw_polygon = pygame.draw.polygon
+    draw_rect = pygame.draw.rect
+    blits = []
+    for j, i in enumerate(visible.tolist()):
+        w, h, padded_w, padded_h = sizes[j]
+        if rgba[j][3] >= 255:
+            # Opaque: draw straight onto the target, after any pending blends
+            if blits:
+                surface.blits(blits, doreturn=False)
+                scratch_pool.release_all()
+                blits = []
+            if straight[i]:
+                # draw.rect clips at the surface edge; fill() would shift the rectangle inward
+                draw_rect(surface, rgba[j][:3], (rect_x[j], rect_y[j], w, h))
+            else:
+                draw_polygon(surface, rgba[j][:3], points[j])
+        else:
+            # Transparent: draw on a pooled padded surface, blended on in one
+            # batch; blend the batch early when the pool runs out of surfaces
+            if not scratch_pool.available(padded_w, padded_h):
+                surface.blits(blits, doreturn=False)
+                scratch_pool.release_all()
+                blits = []
+            temp_surface = scratch_pool.acquire(padded_w, padded_h)
+            if straight[i]:
+                temp_surface.fill(rgba[j], (rect_x[j], rect_y[j], w, h))
+            else:
+                draw_polygon(temp_surface, rgba[j], points[j])
+            blits.append((temp_surface, (dest_x[j], dest_y[j]), (0, 0, padded_w, padded_h)))
+    if blits:
+        surface.blits(blits, doreturn=False)
+        scratch_pool.release_all()
+
+
+def _blit_cached(surface, cache, x, y, width, height, color, rotation, alpha):
+    steps, levels = cache.quantize(rotation, alpha)
+    visible = np.flatnonzero(levels > 0)
+    dest_x = (x - (width + 10) // 2)[visible].tolist()
+    dest_y = (y - (height + 10) // 2)[visible].tolist()
+    keys = np.column_stack([width, height, color, steps, levels])[visible].tolist()
+
+    get = cache.get
+    blits = [(get(w, h, (r, g, b), step, level), (bx, by))
+             for (w, h, r, g, b, step, level), bx, by in zip(keys, dest_x, dest_y)]
+    surface.blits(blits, doreturn=False)
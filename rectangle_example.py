@@ -1,57 +1,50 @@
 import pygame
-import math
-
-def rechthoek(surface, x=100, y=100, width=80, height=40, color=(255, 255, 255), rotation=0):
-    """Draw a rectangle with position, color, and rotation.
-
-    Args:
-        surface: pygame surface to draw on
-        x, y: center position of rectangle
-        width, height: rectangle dimensions
-        color: RGB color tuple
-        rotation: rotation angle in degrees
-    """
-    if rotation == 0:
-        rect = pygame.Rect(x - width//2, y - height//2, width, height)
-        pygame.draw.rect(surface, color, rect)
-    else:
-        points = []
-        half_w, half_h = width // 2, height // 2
-        corners = [(-half_w, -half_h), (half_w, -half_h), (half_w, half_h), (-half_w, half_h)]
-
-        rad = math.radians(rotation)
-        cos_r, sin_r = math.cos(rad), math.sin(rad)
-
-        for cx, cy in corners:
-            rotated_x = cx * cos_r - cy * sin_r + x
-            rotated_y = cx * sin_r + cy * cos_r + y
-            points.append((rotated_x, rotated_y))
-
-        pygame.draw.polygon(surface, color, points)
-
-def main():
+
+from dirty_rects import DirtyRenderer
+from runtime import LiveInput
+from scene import Layer, RectNode, Scene
+
+def main(frames=None, input_source=None, fps=60, on_frame=None):
     pygame.init()
     screen = pygame.display.set_mode((800, 600))
     pygame.display.set_caption("Rectangle Examples")
     clock = pygame.time.Clock()
-
+    input_source = input_source or LiveInput()
+    renderer = DirtyRenderer(screen, (0, 0, 0))
+
+    # Nothing in this scene moves, so it is one static layer that is
+    # flattened into a single cached surface
+    scene = Scene([Layer([
+        RectNode(),
+        RectNode(x=200, y=150, color=(255, 0, 0)),
+        RectNode(x=300, y=200, width=120, height=60, color=(0, 255, 0), rotation=45),
+        RectNode(x=450, y=100, color=(0, 0, 255), rotation=30),
+        RectNode(x=600, y=300, width=100, height=20, color=(255, 255, 0), rotation=90),
+        RectNode(x=150, y=400, width=60, height=100, color=(255, 0, 255), rotation=15),
+    ], static=True)])
+
+    frame = 0
     running = True
     while running:
-        for event in pygame.event.get():
+        for event in input_source.events():
+            renderer.handle_event(event)
             if event.type == pygame.QUIT:
                 running = False
 
-        screen.fill((0, 0, 0))
+        # The scene never changes, so it is only drawn when the whole
+        # screen has to be redrawn
+        if renderer.full:
+            renderer.clear()
+            renderer.mark_all(scene.draw(screen))
 
-        rechthoek(screen)
-        rechthoek(screen, x=200, y=150, color=(255, 0, 0))
-        rechthoek(screen, x=300, y=200, width=120, height=60, color=(0, 255, 0), rotation=45)
-        rechthoek(screen, x=450, y=100, color=(0, 0, 255), rotation=30)
-        rechthoek(screen, x=600, y=300, width=100, height=20, color=(255, 255, 0), rotation=90)
-        rechthoek(screen, x=150, y=400, width=60, height=100, color=(255, 0, 255), rotation=15)
+        if on_frame:
+            on_frame(screen, 6)
 
-        pygame.display.flip()
-        clock.tick(60)
+        renderer.present()
+        clock.tick(fps)
+        frame += 1
+        if frame == frames:
+            running = False
 
     pygame.quit()
 
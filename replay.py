@@ -0,0 +1,206 @@
+"""Record an interactive session and replay it headless, frame for frame.
+
+A recording holds the demo, its random seed and options, the mouse
+position and input events of every frame, the simulation ticks the frame
+ran and the detail level it was drawn at, in a small gzipped JSON file:
+
+    python replay.py record cursor_cloud_system session.rec --start-round 3
+    python replay.py play session.rec --check
+    python benchmark.py --replay session.rec
+"""
+import argparse
+import gzip
+import importlib
+import json
+import random
+
+import pygame
+
+from headless import run
+from lod import LevelOfDetail, ReplayLevelOfDetail
+from runtime import FixedStepScheduler, LiveInput, ReplayScheduler, ScriptedInput
+from sprite_cache import SpriteCache
+
+RECORDABLE = ("mouse_emitter_system", "cursor_cloud_system")
+
+# Input the demos react to; mouse motion is covered by the per-frame positions
+RECORDED_EVENTS = (pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP)
+
+FORMAT_VERSION = 1
+
+
+class RecordingInput:
+    """Passes input through from another source and records it per frame.
+
+    Args:
+        source: input source to record, live pygame input when None
+    """
+
+    def __init__(self, source=None):
+        self.source = source or LiveInput()
+        self.frame = -1
+        self.recorded = {}
+        self.mouse = []
+
+    def events(self):
+        events = self.source.events()
+        self.frame += 1
+        # Take the mouse position once per frame, so a replay sees the
+        # same position however often the demo asks for it
+        self.mouse.append(tuple(self.source.mouse_pos()))
+        kept = [event for event in events if event.type in RECORDED_EVENTS]
+        if kept:
+            self.recorded[self.frame] = kept
+        return events
+
+    def mouse_pos(self):
+        return self.mouse[-1] if self.mouse else self.source.mouse_pos()
+
+
+def _event_attributes(event):
+    # Only plain values survive JSON; window handles and the like are dropped
+    return {name: value for name, value in event.dict.items()
+            if isinstance(value, (bool, int, float, str))
+            or isinstance(value, tuple) and all(isinstance(v, (int, float)) for v in value)}
+
+
+class Recording:
+    """A recorded session: everything needed to run it again."""
+
+    def __init__(self, demo, seed, options, mouse, events, ticks, levels=()):
+        self.demo = demo
+        self.seed = seed
+        self.options = options
+        self.mouse = mouse
+        self.events = events
+        self.ticks = ticks
+        self.levels = list(levels)
+
+    @property
+    def frames(self):
+        return len(self.mouse)
+
+    def input(self):
+        scheduled = {frame: [pygame.event.Event(kind, attributes) for kind, attributes in events]
+                     for frame, events in self.events.items()}
+        last = self.frames - 1
+        return ScriptedInput(scheduled, lambda frame: self.mouse[min(frame, last)])
+
+    def main_options(self):
+        """Keyword arguments for the demo's main(), apart from rng and input."""
+        options = dict(self.options, scheduler=ReplayScheduler(self.ticks), lod=ReplayLevelOfDetail(self.levels))
+        if options.pop('sprite_cache', False):
+            options['sprite_cache'] = SpriteCache()
+        return options
+
+    def save(self, path):
+        # Mouse positions are delta encoded, which gzip packs well
+        deltas, last = [], (0, 0)
+        for x, y in self.mouse:
+            deltas += [x - last[0], y - last[1]]
+            last = (x, y)
+        data = {
+            'version': FORMAT_VERSION,
+            'demo': self.demo,
+            'seed': self.seed,
+            'options': self.options,
+            'mouse': deltas,
+            'events': [[frame, kind, attributes] for frame, events in sorted(self.events.items())
+                       for kind, attributes in events],
+            'ticks': [[ticks, alpha] for ticks, alpha in self.ticks],
+            'levels': self.levels,
+        }
+        with gzip.open(path, "wt") as f:
+            json.dump(data, f, separators=(",", ":"))
+
+
+def load(path):
+    with gzip.open(path, "rt") as f:
+        data = json.load(f)
+    if data['version'] != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported recording version {data['version']}")
+
+    mouse, x, y = [], 0, 0
+    deltas = data['mouse']
+    for dx, dy in zip(deltas[::2], deltas[1::2]):
+        x, y = x + dx, y + dy
+        mouse.append((x, y))
+    events = {}
+    for frame, kind, attributes in data['events']:
+        attributes = {name: tuple(value) if isinstance(value, list) else value for name, value in attributes.items()}
+        events.setdefault(frame, []).append((kind, attributes))
+    ticks = [(ticks, alpha) for ticks, alpha in data['ticks']]
+    # Recordings made before detail levels were recorded drew at full detail
+    return Recording(data['demo'], data['seed'], data['options'], mouse, events, ticks, data.get('levels', ()))
+
+
+def record(demo, path, seed=None, source=None, frames=None, **options):
+    """Play a demo at its normal frame rate and save the session to ``path``.
+
+    Input comes from ``source``, live pygame input when None. ``options``
+    go to the demo's main() and must be plain JSON values;
+    ``sprite_cache=True`` stands for a fresh SpriteCache.
+    """
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    recorder = RecordingInput(source)
+    ticks, levels = [], []
+    main_options = dict(options)
+    if main_options.pop('sprite_cache', False):
+        main_options['sprite_cache'] = SpriteCache()
+    try:
+        importlib.import_module(demo).main(frames=frames, rng=random.Random(seed), input_source=recorder,
+                                           scheduler=FixedStepScheduler(60, history=ticks),
+                                           lod=LevelOfDetail(target_ms=1000 / 60, history=levels), **main_options)
+    finally:
+        # Save whatever was played, also when the demo crashed
+        events = {frame: [(event.type, _event_attributes(event)) for event in kept]
+                  for frame, kept in recorder.recorded.items()}
+        recording = Recording(demo, seed, options, recorder.mouse, events, ticks[:len(recorder.mouse)],
+                              levels[:len(recorder.mouse)])
+        recording.save(path)
+    return recording
+
+
+def play(path, on_frame=None, digest=True):
+    """Replay a recording headless at full speed; returns headless.run()'s result."""
+    recording = load(path)
+    return run(recording.demo, recording.frames, recording.seed, recording.input(), on_frame, digest,
+               **recording.main_options())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    recorder = commands.add_parser("record", help="play a demo and record the session")
+    recorder.add_argument("demo", choices=RECORDABLE)
+    recorder.add_argument("path")
+    recorder.add_argument("--seed", type=int)
+    recorder.add_argument("--start-round", type=int, help="first fire round (cursor_cloud_system)")
+    recorder.add_argument("--sprite-cache", action="store_true")
+    player = commands.add_parser("play", help="replay a recording headless")
+    player.add_argument("path")
+    player.add_argument("--check", action="store_true", help="replay twice and verify the frames are identical")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        options = {}
+        if args.start_round is not None:
+            options['start_round'] = args.start_round
+        if args.sprite_cache:
+            options['sprite_cache'] = True
+        recording = record(args.demo, args.path, args.seed, **options)
+        print(f"Recorded {recording.frames} frames of {args.demo} (seed {recording.seed}) to {args.path}")
+        return
+
+    result = play(args.path)
+    print(f"{result['demo']}: {result['frames']} frames in {result['seconds']:.2f}s "
+          f"({result['fps']:.0f} fps), digest {result['digest'][:16]}")
+    if args.check:
+        if play(args.path)['digest'] != result['digest']:
+            raise SystemExit("Replays differ: the recording does not replay deterministically")
+        print("Second replay is bit-identical")
+
+
+if __name__ == "__main__":
+    main()
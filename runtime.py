@@ -0,0 +1,133 @@
+import time
+
+import pygame
+
+
+class LiveInput:
+    """Events and mouse position straight from pygame."""
+
+    def events(self):
+        return pygame.event.get()
+
+    def mouse_pos(self):
+        return pygame.mouse.get_pos()
+
+
+class ScriptedInput:
+    """Replays a fixed script of events and mouse positions, frame by frame.
+
+    Args:
+        events: dict mapping a frame number to the list of pygame events
+            delivered on that frame
+        mouse: function mapping a frame number to the mouse position
+    """
+
+    def __init__(self, events=None, mouse=None):
+        self.scheduled = events or {}
+        self.mouse = mouse or (lambda frame: (400, 300))
+        self.frame = -1
+
+    def events(self):
+        pygame.event.get()  # Drain the real queue, only the script counts
+        self.frame += 1
+        return list(self.scheduled.get(self.frame, ()))
+
+    def mouse_pos(self):
+        return self.mouse(max(0, self.frame))
+
+
+def mouse_down(button=1):
+    return pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=button)
+
+
+def mouse_up(button=1):
+    return pygame.event.Event(pygame.MOUSEBUTTONUP, button=button)
+
+
+def key_down(key):
+    return pygame.event.Event(pygame.KEYDOWN, key=key)
+
+
+class FixedStepScheduler:
+    """Runs simulation ticks at a fixed rate, independent of the frame rate.
+
+    Real time is collected in an accumulator and spent in whole ticks; the
+    leftover fraction of a tick, ``alpha``, is used to interpolate drawing
+    between the previous and the current simulation state. When the
+    simulation falls behind, frames are left undrawn (at most
+    ``max_skipped_frames`` in a row) while the ticks catch up, so gameplay
+    keeps its speed under load. Only lag beyond ``max_lag`` seconds, such
+    as a paused window, is dropped.
+
+    With ``lockstep`` every frame runs exactly one tick and is drawn at the
+    current state, which keeps headless runs deterministic. When
+    ``history`` is a list, the ticks and ``alpha`` of every frame are
+    appended to it, so the run can be replayed with ReplayScheduler.
+    """
+
+    def __init__(self, tick_rate=60, lockstep=False, max_skipped_frames=5, max_lag=1.0, history=None):
+        self.step = 1 / tick_rate
+        self.lockstep = lockstep
+        self.max_skipped_frames = max_skipped_frames
+        self.max_lag = max_lag
+        self.accumulator = 0.0
+        self.last_time = None
+        self.alpha = 1.0
+        self.render = True
+        self.ticks = 0
+        self.rendered_frames = 0
+        self.skipped_frames = 0
+        self.skipped_in_row = 0
+        self.history = history
+
+    def advance(self):
+        """Return the number of simulation ticks to run this frame."""
+        ticks, self.alpha = self._due()
+        if self.history is not None:
+            self.history.append((ticks, self.alpha))
+
+        # More than two ticks due means drawing cannot keep up, so spend
+        # this frame on the simulation instead
+        behind = ticks > 2 and self.skipped_in_row < self.max_skipped_frames
+        self.render = not behind
+        if behind:
+            self.skipped_frames += 1
+            self.skipped_in_row += 1
+        else:
+            self.rendered_frames += 1
+            self.skipped_in_row = 0
+        self.ticks += ticks
+        return ticks
+
+    def _due(self):
+        # Ticks to run and the interpolation alpha for this frame
+        if self.lockstep:
+            return 1, 1.0
+
+        now = time.perf_counter()
+        if self.last_time is None:
+            # The first frame always gets a tick, so there is a state to draw
+            self.last_time = now
+            self.accumulator = 0.0
+            return 1, 0.0
+        elapsed = now - self.last_time
+        self.accumulator = min(self.accumulator + elapsed, self.max_lag)
+        self.last_time = now
+        ticks = int(self.accumulator / self.step)
+        self.accumulator -= ticks * self.step
+        return ticks, self.accumulator / self.step
+
+
+class ReplayScheduler(FixedStepScheduler):
+    """Runs the ticks of a recorded FixedStepScheduler history, frame by frame.
+
+    The simulation then advances exactly as in the recorded run, however
+    fast the replay goes. Frames beyond the recording run one tick each.
+    """
+
+    def __init__(self, history, tick_rate=60, max_skipped_frames=5):
+        super().__init__(tick_rate, max_skipped_frames=max_skipped_frames)
+        self.recorded = iter(history)
+
+    def _due(self):
+        return next(self.recorded, (1, 1.0))
@@ -0,0 +1,164 @@
+import math
+
+import pygame
+
+
+class RectNode:
+    """A rectangle in a retained scene, drawn like rechthoek() draws it.
+
+    The rotated corner points are computed only when the node's transform
+    changes, and the rectangle is rasterized to a sprite of its own that is
+    reused for as long as its color and pixel shape stay the same, so
+    moving a node by whole pixels only moves the sprite.
+
+    Args:
+        x, y: center position of the rectangle
+        width, height: rectangle dimensions
+        color: RGB color tuple
+        rotation: rotation angle in degrees
+    """
+
+    def __init__(self, x=100, y=100, width=80, height=40, color=(255, 255, 255), rotation=0):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.color = color
+        self.rotation = rotation
+        self.version = 0  # Bumped on every change, so layers can tell
+        self._points = None
+        self._raster_key = None
+        self._raster = None
+        self.rasterized = 0
+
+    def set(self, **changes):
+        """Change attributes such as x, y or rotation; unchanged values cost nothing."""
+        changed = False
+        for name, value in changes.items():
+            if getattr(self, name) != value:
+                setattr(self, name, value)
+                changed = True
+        if changed:
+            self._points = None
+            self.version += 1
+
+    @property
+    def points(self):
+        """Corner points on screen, in the order rechthoek() visits them."""
+        if self._points is None:
+            half_w, half_h = self.width // 2, self.height // 2
+            rad = math.radians(self.rotation)
+            cos_r, sin_r = math.cos(rad), math.sin(rad)
+            self._points = [(cx * cos_r - cy * sin_r + self.x, cx * sin_r + cy * cos_r + self.y)
+                            for cx, cy in ((-half_w, -half_h), (half_w, -half_h), (half_w, half_h), (-half_w, half_h))]
+        return self._points
+
+    def _shape(self):
+        # pygame truncates float coordinates toward zero, so the pixels a
+        # node covers follow from its truncated corners. Returns the top
+        # left pixel and the shape relative to it.
+        if self.rotation == 0:
+            left, top = math.trunc(self.x - self.width//2), math.trunc(self.y - self.height//2)
+            return left, top, ("rect", self.width, self.height)
+        corners = [(math.trunc(px), math.trunc(py)) for px, py in self.points]
+        left = min(px for px, _ in corners)
+        top = min(py for _, py in corners)
+        return left, top, ("polygon", tuple((px - left, py - top) for px, py in corners))
+
+    def _rasterize(self, shape):
+        if shape[0] == "rect":
+            _, width, height = shape
+            raster = pygame.Surface((width, height))
+            raster.fill(self.color)
+        else:
+            corners = shape[1]
+            raster = pygame.Surface((max(px for px, _ in corners) + 1, max(py for _, py in corners) + 1),
+                                    pygame.SRCALPHA)
+            pygame.draw.polygon(raster, self.color, corners)
+        self._raster = raster
+        self.rasterized += 1
+
+    def draw(self, surface):
+        """Blit the node's sprite and return the screen area it covers."""
+        left, top, shape = self._shape()
+        if shape[0] == "polygon":
+            right = left + max(px for px, _ in shape[1])
+            bottom = top + max(py for _, py in shape[1])
+            if left < 0 or top < 0 or right >= surface.get_width() or bottom >= surface.get_height():
+                # pygame clips polygons that cross the surface edge in its
+                # own way, so those are drawn directly
+                return pygame.draw.polygon(surface, self.color, self.points)
+
+        # Moving by whole pixels keeps the key, only the blit position moves
+        key = (self.color, shape)
+        if key != self._raster_key:
+            self._raster_key = key
+            self._rasterize(shape)
+        return surface.blit(self._raster, (left, top))
+
+
+class Layer:
+    """An ordered group of scene nodes.
+
+    A static layer is flattened into one cached surface the first time it
+    is drawn and afterwards costs a single blit, until one of its nodes
+    changes.
+
+    Args:
+        nodes: the nodes of the layer, drawn in order
+        static: whether to cache the whole layer as one surface
+    """
+
+    def __init__(self, nodes=(), static=False):
+        self.nodes = list(nodes)
+        self.static = static
+        self._surface = None
+        self._bounds = None
+        self._versions = None
+        self.flattened = 0
+
+    def add(self, node):
+        self.nodes.append(node)
+        return node
+
+    def draw(self, surface):
+        """Draw the layer and return the list of screen areas it covers."""
+        if not self.static:
+            return [node.draw(surface) for node in self.nodes]
+
+        versions = [(id(node), node.version) for node in self.nodes]
+        if versions != self._versions:
+            self._versions = versions
+            self._flatten(surface)
+        if self._surface is None:
+            return []
+        return [surface.blit(self._surface, self._bounds)]
+
+    def _flatten(self, target):
+        self.flattened += 1
+        if not self.nodes:
+            self._surface = None
+            return
+
+        layer = pygame.Surface(target.get_size(), pygame.SRCALPHA)
+        rects = [node.draw(layer) for node in self.nodes]
+        self._bounds = rects[0].unionall(rects)
+        self._surface = layer.subsurface(self._bounds).copy()
+
+
+class Scene:
+    """Layers of retained nodes, drawn back to front."""
+
+    def __init__(self, layers=()):
+        self.layers = list(layers)
+
+    def add(self, layer):
+        self.layers.append(layer)
+        return layer
+
+    def draw(self, surface):
+        """Draw every layer and return the list of screen areas covered."""
+        rects = []
+        for layer in self.layers:
+            rects.extend(layer.draw(surface))
+        return rects
@@ -0,0 +1,93 @@
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+
+class XIndex:
+    """Sorted index over the x positions of a set of items.
+
+    Answers "which items lie within ``radius`` of this x" with a binary
+    search instead of a scan over every item, and does so for a whole array
+    of query positions at once.
+    """
+
+    def __init__(self, xs):
+        xs = np.asarray(xs, dtype=np.float64)
+        self.order = np.argsort(xs, kind="stable")
+        self.sorted_x = xs[self.order]
+
+    def __len__(self):
+        return len(self.sorted_x)
+
+    def query(self, x, radius):
+        """Indices of the items with ``abs(item_x - x) < radius``."""
+        lo = np.searchsorted(self.sorted_x, x - radius, side="right")
+        hi = np.searchsorted(self.sorted_x, x + radius, side="left")
+        return self.order[lo:hi]
+
+    def pairs(self, xs, radius):
+        """All (query, item) index pairs with ``abs(item_x - xs[query]) < radius``.
+
+        Returns two equally long arrays: positions into ``xs`` and the
+        matching item indices.
+        """
+        xs = np.asarray(xs, dtype=np.float64)
+        lo = np.searchsorted(self.sorted_x, xs - radius, side="right")
+        hi = np.searchsorted(self.sorted_x, xs + radius, side="left")
+        counts = np.maximum(hi - lo, 0)
+        total = int(counts.sum())
+        if total == 0:
+            empty = np.empty(0, dtype=np.intp)
+            return empty, empty
+
+        queries = np.repeat(np.arange(len(xs)), counts)
+        # Position of each pair within its query's run of matching items
+        starts = np.cumsum(counts) - counts
+        within = np.arange(total) - np.repeat(starts, counts)
+        return queries, self.order[np.repeat(lo, counts) + within]
+
+
+class SortedXList:
+    """Items kept sorted by x while they come and go.
+
+    Unlike XIndex, which is built once over a fixed set, items are added
+    and removed one at a time with a binary search, so the index stays up
+    to date without being rebuilt. Iterating gives the items in x order.
+    """
+
+    def __init__(self):
+        self.xs = []
+        self.items = []
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def add(self, x, item):
+        i = bisect_right(self.xs, x)
+        self.xs.insert(i, x)
+        self.items.insert(i, item)
+
+    def remove(self, x, item):
+        """Remove ``item``, which was added at ``x``; it must be present."""
+        i = bisect_left(self.xs, x)
+        while self.items[i] is not item:
+            i += 1
+        del self.xs[i]
+        del self.items[i]
+
+    def clear(self):
+        self.xs.clear()
+        self.items.clear()
+
+    def any_within(self, x, radius):
+        """Whether any item has ``abs(item_x - x) < radius``."""
+        i = bisect_right(self.xs, x - radius)
+        return i < len(self.xs) and self.xs[i] < x + radius
+
+    def x_index(self):
+        """An XIndex over the current items, for batched queries; its
+        indices refer to positions in ``items``."""
+        return XIndex(self.xs)
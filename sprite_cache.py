@@ -0,0 +1,86 @@
+import math
+from collections import OrderedDict
+
+import numpy as np
+import pygame
+
+
+class SpriteCache:
+    """Memory-bounded LRU cache of pre-rasterized rotated rectangles.
+
+    Rotation is snapped to ``rotation_steps`` angles per full turn and alpha
+    to ``alpha_levels`` levels, so spinning particles keep hitting the same
+    few sprites instead of being rasterized again every frame. Sprites are
+    padded like the ones rechthoek() draws, so they blit to the same spot.
+    The least recently used sprites are evicted once the cached pixels take
+    more than ``max_bytes``.
+    """
+
+    def __init__(self, rotation_steps=64, alpha_levels=16, max_bytes=16 * 1024 * 1024):
+        self.rotation_steps = rotation_steps
+        self.alpha_levels = alpha_levels
+        self.max_bytes = max_bytes
+        self.sprites = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.sprites)
+
+    def quantize(self, rotation, alpha):
+        """Snap rotations (degrees) and alphas (0-255) to cache steps and levels.
+
+        Accepts scalars or arrays and returns ``(steps, levels)`` of the same shape.
+        """
+        steps = np.rint(np.asarray(rotation) * self.rotation_steps / 360).astype(np.int64) % self.rotation_steps
+        if self.rotation_steps % 2 == 0:
+            # A rectangle turned half a turn looks the same
+            steps %= self.rotation_steps // 2
+        levels = np.rint(np.asarray(alpha) * (self.alpha_levels - 1) / 255).astype(np.int64)
+        return steps, levels
+
+    def get(self, width, height, color, step, level):
+        """Return the padded sprite for a quantized rectangle, rasterizing it on a miss."""
+        key = (width, height, color, step, level)
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            self.hits += 1
+            self.sprites.move_to_end(key)
+            return sprite
+
+        self.misses += 1
+        sprite = self._rasterize(width, height, color, step, level)
+        self.sprites[key] = sprite
+        self.bytes += sprite.get_width() * sprite.get_height() * 4
+        while self.bytes > self.max_bytes and len(self.sprites) > 1:
+            _, evicted = self.sprites.popitem(last=False)
+            self.bytes -= evicted.get_width() * evicted.get_height() * 4
+            self.evictions += 1
+        return sprite
+
+    def _rasterize(self, width, height, color, step, level):
+        pad_w, pad_h = width + 10, height + 10
+        sprite = pygame.Surface((pad_w, pad_h), pygame.SRCALPHA)
+        alpha = round(level * 255 / (self.alpha_levels - 1))
+        if step == 0:
+            pygame.draw.rect(sprite, (*color, alpha), pygame.Rect(5, 5, width, height))
+            return sprite
+
+        half_w, half_h = width // 2, height // 2
+        corners = [(-half_w, -half_h), (half_w, -half_h), (half_w, half_h), (-half_w, half_h)]
+        rad = math.radians(step * 360 / self.rotation_steps)
+        cos_r, sin_r = math.cos(rad), math.sin(rad)
+        points = [(cx * cos_r - cy * sin_r + pad_w // 2, cx * sin_r + cy * cos_r + pad_h // 2) for cx, cy in corners]
+        pygame.draw.polygon(sprite, (*color, alpha), points)
+        return sprite
+
+    def stats(self):
+        return {
+            'sprites': len(self.sprites),
+            'bytes': self.bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
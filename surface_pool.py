@@ -0,0 +1,62 @@
+import pygame
+
+
+class SurfacePool:
+    """Reusable transparent scratch surfaces, grouped by size bucket.
+
+    Drawing a transparent rectangle needs a temporary SRCALPHA surface.
+    Instead of allocating one per rectangle per frame, acquire() hands out a
+    pooled surface whose size is rounded up to the bucket size, cleared in
+    the requested top-left area. Blit only that area. Surfaces return to the
+    pool with release_all() once their blits are done, so after the first
+    few frames no new surfaces are allocated.
+
+    At most ``max_in_use`` surfaces of a bucket are handed out between
+    releases, which bounds the pool's memory. Callers that batch their
+    blits check available() and blit and release before it runs out.
+    """
+
+    def __init__(self, bucket_size=16, max_in_use=32):
+        self.bucket_size = bucket_size
+        self.max_in_use = max_in_use
+        self.buckets = {}
+        self.in_use = {}
+        self.allocations = 0
+
+    def _bucket(self, width, height):
+        step = self.bucket_size
+        return (-(-width // step) * step, -(-height // step) * step)
+
+    def available(self, width, height):
+        """Whether acquire() can hand out a surface of this size before the next release."""
+        return self.in_use.get(self._bucket(width, height), 0) < self.max_in_use
+
+    def acquire(self, width, height):
+        """Return a scratch surface of at least width x height, cleared in that area."""
+        key = self._bucket(width, height)
+        surfaces = self.buckets.setdefault(key, [])
+        used = self.in_use.get(key, 0)
+        if used == self.max_in_use:
+            raise RuntimeError(f"all {self.max_in_use} scratch surfaces of {key} are in use; release them first")
+        if used == len(surfaces):
+            surfaces.append(pygame.Surface(key, pygame.SRCALPHA))
+            self.allocations += 1
+        surface = surfaces[used]
+        self.in_use[key] = used + 1
+        surface.fill((0, 0, 0, 0), (0, 0, width, height))
+        return surface
+
+    def release_all(self):
+        """Return every acquired surface to the pool."""
+        self.in_use.clear()
+
+    def stats(self):
+        return {
+            'buckets': len(self.buckets),
+            'surfaces': sum(len(surfaces) for surfaces in self.buckets.values()),
+            'allocations': self.allocations,
+        }
+
+
+# Shared pool used by rechthoek() and rechthoek_batch()
+scratch_pool = SurfacePool()